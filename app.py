@@ -1,15 +1,8 @@
 from flask import Flask, json
-from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
+from module.provider import JsonProvider
 from config import conf
 from view import add_view
-app = Flask(
-    __name__,
-    static_folder=conf["static_folder"],
-    template_folder=conf["template_folder"]
-)
-app.config.update(conf["app-config"])
-CORS(app)
 
 
 def getresponse(info, **params):
@@ -24,14 +17,46 @@ def getresponse(info, **params):
     return response
 
 
-@app.errorhandler(HTTPException)
 def handle_exception(error):
     return getresponse(error)
 
 
-add_view(
-    app, "main", "admin", "container"
-)
+def create_app(settings=None, views=None):
+    from flask_cors import CORS
+    from logger import Logging
+    from module.metrics import install
+    from module import profiler
+    settings = settings or conf
+    app = Flask(
+        __name__,
+        static_folder=settings["static_folder"],
+        template_folder=settings["template_folder"]
+    )
+    app.json = JsonProvider(app)
+    app.config.update(settings["app-config"])
+    Logging.setup(
+        level=app.config.get("LOG_LEVEL", "INFO"),
+        sampling=app.config.get("LOG_SAMPLING"),
+        max_bytes=app.config.get("LOG_MAX_BYTES", 10 * 1024 ** 2),
+        interval=app.config.get("LOG_INTERVAL", 24 * 3600.0),
+        backups=app.config.get("LOG_BACKUPS", 7)
+    )
+    CORS(app)
+    app.register_error_handler(HTTPException, handle_exception)
+    add_view(app, *(views or settings.get("views", ("main", "admin", "container"))))
+    profiler.install(app)
+    install(app)
+    return app
+
+
+def __getattr__(name):
+    # `app:app` deploy commands keep working; the app is built on first access
+    # so importing create_app alone has no side effects.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(**conf["app-server"])
+    create_app().run(**conf["app-server"])
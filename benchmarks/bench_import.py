@@ -0,0 +1,51 @@
+from pathlib import Path
+from subprocess import run as run_process, PIPE
+from tempfile import TemporaryDirectory
+from statistics import median
+import sys
+import io
+import tarfile
+home = Path(__file__).parent.parent
+probe = (
+    "from time import perf_counter; start = perf_counter(); import {module}; "
+    "print(perf_counter() - start)"
+)
+
+
+def import_time(folder, module, repeat):
+    timings = []
+    for _ in range(repeat):
+        out = run_process(
+            [sys.executable, "-c", probe.format(module=module)],
+            cwd=str(folder), stdout=PIPE, check=True, text=True
+        ).stdout
+        timings.append(float(out.strip().splitlines()[-1]))
+    return dict(min=min(timings), median=median(timings))
+
+
+def checkout(revision, folder, paths=("module",)):
+    archive = run_process(
+        ["git", "archive", revision, *paths], cwd=str(home), stdout=PIPE, check=True
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(str(folder))
+
+
+def run(module="module.utils", repeat=10, baseline=None):
+    results = dict(current=import_time(home, module, repeat))
+    if baseline:
+        with TemporaryDirectory() as folder:
+            checkout(baseline, folder)
+            results[baseline] = import_time(folder, module, repeat)
+    return results
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--module", default="module.utils")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+    for name, result in run(args.module, args.repeat, args.baseline).items():
+        print(f"{name:<12} min={result['min'] * 1e3:.1f}ms median={result['median'] * 1e3:.1f}ms")
@@ -0,0 +1,59 @@
+from module.serializer import Serializer, orjson
+from module.utils import getjson
+from benchmarks.fixtures import video_names
+from pathlib import Path
+from time import perf_counter
+import json
+data_folder = Path(__file__).parent.parent.joinpath("container", "data", "videos")
+
+
+def payloads():
+    # The cached git listings, plus a synthetic listing the size of a full container.
+    loaded = {path.name: getjson(path) for path in sorted(data_folder.glob("*.json"))}
+    loaded["synthetic-5000"] = [
+        dict(name=name, url=f"https://github.com/x/videos/raw/main/{name}", size=index * 1.0e-3)
+        for index, name in enumerate(video_names("bench", 5000))
+    ]
+    return loaded
+
+
+def timeit(func, repeat, number):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (perf_counter() - start) / number)
+    return best
+
+
+def run(repeat=5, number=20):
+    stdlib = Serializer("json")
+    backends = dict(
+        json_pretty=(stdlib, dict(indent=4, sort_keys=True)),
+        json_compact=(stdlib, dict())
+    )
+    if orjson is not None:
+        backends["orjson_compact"] = (Serializer("orjson"), dict())
+    results = dict()
+    for name, data in payloads().items():
+        results[name] = dict()
+        for backend, (serializer, config) in backends.items():
+            raw = serializer.dumps(data, **config)
+            assert json.loads(raw) == data, f"{backend} output differs for {name}"
+            results[name][backend] = dict(
+                dumps=timeit(lambda: serializer.dumps(data, **config), repeat, number),
+                loads=timeit(lambda: serializer.loads(raw), repeat, number),
+                size=len(raw)
+            )
+    return results
+
+
+if __name__ == "__main__":
+    for name, timings in run().items():
+        print(name)
+        for backend, result in timings.items():
+            print(
+                f"  {backend:<15} dumps={result['dumps'] * 1e6:9.1f}us "
+                f"loads={result['loads'] * 1e6:9.1f}us size={result['size']}"
+            )
@@ -0,0 +1,82 @@
+from benchmarks.fixtures import github_page
+from container.links import iter_links, get_backend
+from pathlib import Path
+from time import perf_counter
+pages_folder = Path(__file__).parent.joinpath("pages")
+sizes = (10, 1000, 10000)
+# Markup where lxml and BeautifulSoup disagree: lxml keeps the first of two
+# title attributes and moves anchors found in <head> into the body.
+edge_cases = (
+    '''<html><body><a title="first" title="last" href="/v/a.mp4">a</a></body></html>''',
+    '''<html><head><a href="/v/head.mp4" title="head">h</a></head>
+<body><a href="/v/body.mp4" title="body">b</a></body></html>'''
+)
+
+
+def fixture_page(count):
+    path = pages_folder.joinpath(f"videos-{count}.html")
+    if not path.exists():
+        pages_folder.mkdir(exist_ok=True)
+        path.write_text(github_page("bench", count), encoding="utf-8")
+    return path.read_text(encoding="utf-8")
+
+
+def soup_links(page):
+    from bs4 import BeautifulSoup
+    return [
+        (a.get("title"), a.get("href"))
+        for a in BeautifulSoup(page, "html.parser").find("body").find_all("a")
+        if a.get("href").endswith(".mp4")
+    ]
+
+
+def chunked(page, size=65536):
+    return (page[i:i + size] for i in range(0, len(page), size))
+
+
+def timeit(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def check_edge_cases():
+    exact = dict(stream=True, lxml=get_backend("lxml") == "lxml")
+    for page in edge_cases:
+        expected = soup_links(page)
+        assert list(iter_links(page)) == expected, f"stream output differs on {page!r}"
+        if exact["lxml"]:
+            exact["lxml"] = list(iter_links(page, backend="lxml")) == expected
+    return exact
+
+
+def run(repeat=3):
+    exact = check_edge_cases()
+    results = dict()
+    for count in sizes:
+        page = fixture_page(count)
+        expected = soup_links(page)
+        parsers = dict(
+            bs4=lambda: soup_links(page),
+            stream=lambda: list(iter_links(chunked(page)))
+        )
+        if get_backend("lxml") == "lxml":
+            parsers["lxml"] = lambda: list(iter_links(chunked(page), backend="lxml"))
+        results[count] = dict()
+        for name, parser in parsers.items():
+            assert parser() == expected, f"{name} output differs for {count} entries"
+            results[count][name] = timeit(parser, repeat)
+    return results, exact
+
+
+if __name__ == "__main__":
+    results, exact = run()
+    for count, timings in results.items():
+        print(f"entries={count:<6}", " ".join(
+            f"{name}={value * 1e3:.1f}ms" for name, value in timings.items()
+        ))
+    if get_backend("lxml") == "lxml" and not exact["lxml"]:
+        print("lxml differs from BeautifulSoup on the edge cases; keep html.parser as the default")
@@ -0,0 +1,34 @@
+from benchmarks.fixtures import FakeGitHub
+from container.scraper import GitScraper
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from sys import argv
+
+
+def run(containers=32, count=200, latency=0.05, workers=(1, 4, 8, 16)):
+    ids = [f"c{i}" for i in range(containers)]
+    results = dict()
+    with FakeGitHub(count=count, latency=latency) as server:
+        for n in workers:
+            with TemporaryDirectory() as tmp:
+                scraper = GitScraper(
+                    server.url, Path(tmp).joinpath("videos"),
+                    Path(tmp).joinpath("validators.json"), workers=n
+                )
+                scraper.folder.mkdir()
+                cold = scraper.refresh(ids)
+                warm = scraper.refresh(ids)
+                results[n] = dict(
+                    cold=cold["total_time"], revalidate=warm["total_time"],
+                    not_modified=sum(r["status"] == 304 for r in warm["results"])
+                )
+    return results
+
+
+if __name__ == "__main__":
+    opts = dict(containers=int(argv[1])) if len(argv) > 1 else dict()
+    for n, result in run(**opts).items():
+        print(
+            f"workers={n:<3} cold={result['cold']:.3f}s "
+            f"revalidate={result['revalidate']:.3f}s not_modified={result['not_modified']}"
+        )
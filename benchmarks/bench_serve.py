@@ -0,0 +1,197 @@
+from benchmarks.fixtures import FakeGitHub
+from benchmarks.suite import build_tree, touch
+from tempfile import TemporaryDirectory
+from http.client import HTTPConnection
+from importlib.util import find_spec
+from subprocess import Popen, DEVNULL
+from threading import Thread, Event
+from socket import socket
+from pathlib import Path
+from random import Random
+from time import perf_counter, sleep
+from json import dumps
+from os import environ
+import sys
+home = Path(__file__).parent.parent
+default_modes = ("sync", "gthread", "gevent")
+workloads = dict(
+    listing=(6, (
+        "/container/videos/", "/container/videos/c0/", "/container/pictures/p0/?limit=100",
+        "/drive/documents/", "/drive/videos/"
+    )),
+    scrape=(2, (("POST", "/container/videos/refresh/?ids=c0"),)),
+    download=(1, ("/drive/videos/large.bin/",))
+)
+
+
+def free_port():
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def fetch(port, url, rate=None, stop=None, timeout=60, chunk=64 * 1024):
+    # A fresh connection per request, so sync workers are not penalised for
+    # not keeping connections alive. `rate` (bytes/s) makes a slow reader.
+    # `url` is a path, or a (method, path) pair for anything but GET.
+    method, url = url if isinstance(url, tuple) else ("GET", url)
+    start, size = perf_counter(), 0
+    connection = HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(method, url)
+        response = connection.getresponse()
+        while True:
+            data = response.read(chunk)
+            if not data:
+                break
+            size += len(data)
+            if rate:
+                if stop is not None and stop.is_set():
+                    return None, size, None, perf_counter()
+                sleep(len(data) / rate)
+        end = perf_counter()
+        return response.status, size, end - start, end
+    finally:
+        connection.close()
+
+
+def start_server(mode, port, workers, env):
+    process = Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}",
+         "-w", str(workers), "app:create_app()"],
+        cwd=str(home), env=dict(env, **{"SERVER-MODE": mode}), stdout=DEVNULL, stderr=DEVNULL
+    )
+    deadline = perf_counter() + 60
+    while perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode} in {mode} mode")
+        try:
+            if fetch(port, "/", timeout=5)[0] == 200:
+                return process
+        except OSError:
+            sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer in {mode} mode")
+
+
+def load(port, clients, slow, duration, rate, seed=0):
+    names = list(workloads)
+    weights = [workloads[name][0] for name in names]
+    results = {name: [] for name in names + (["slow_download"] if slow else [])}
+    stop = Event()
+    # Requests stuck behind a starved pool fail instead of stretching the run.
+    timeout = duration + 10.0
+
+    def client(n):
+        random = Random(seed + n)
+        while not stop.is_set():
+            name = random.choices(names, weights)[0]
+            url = random.choice(workloads[name][1])
+            try:
+                results[name].append(fetch(port, url, timeout=timeout))
+            except OSError:
+                results[name].append((0, 0, None, perf_counter()))
+
+    def slow_client():
+        while not stop.is_set():
+            try:
+                results["slow_download"].append(
+                    fetch(port, workloads["download"][1][0], rate, stop, timeout)
+                )
+            except OSError:
+                results["slow_download"].append((0, 0, None, perf_counter()))
+
+    threads = [Thread(target=slow_client, daemon=True) for _ in range(slow)]
+    threads += [Thread(target=client, args=(n,), daemon=True) for n in range(clients)]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    sleep(duration)
+    stop.set()
+    end = perf_counter()
+    for thread in threads:
+        thread.join(timeout + 5.0)
+    report = dict(elapsed=end - start, workloads=dict())
+    done = 0
+    for name, items in results.items():
+        # Successes count only inside the window; aborted slow reads are
+        # dropped and failures (timeouts behind a starved pool) always count.
+        items = [i for i in items if i[0] is not None and (i[0] != 200 or i[3] <= end)]
+        ok = [t for status, _, t, _ in items if status == 200]
+        report["workloads"][name] = dict(
+            requests=len(items), errors=len(items) - len(ok),
+            p50=percentile(ok, 0.5), p99=percentile(ok, 0.99),
+            mb=sum(size for _, size, _, _ in items) * 1.0e-6
+        )
+        if name != "slow_download":
+            done += len(ok)
+    report["throughput"] = done / report["elapsed"]
+    return report
+
+
+def run(modes=default_modes, workers=2, clients=16, slow=4, duration=10.0,
+        latency=0.25, size=16, rate=4.0e6, count=200):
+    results = dict(
+        meta=dict(workers=workers, clients=clients, slow=slow, duration=duration,
+                  latency=latency, size=size, rate=rate, count=count),
+        modes=dict()
+    )
+    with TemporaryDirectory() as tmp, FakeGitHub(count=count, latency=latency) as server:
+        root_home, drive, data = build_tree(Path(tmp), count)
+        touch(drive.joinpath("storage", "videos", "large.bin"), size * 10 ** 6)
+        env = dict(
+            environ, HOME=str(root_home), **{
+                "GIT-URL": server.url, "DRIVE-ROOT": str(drive), "CONTAINER-DATA": str(data)
+            }
+        )
+        for mode in modes:
+            if mode == "gevent" and find_spec("gevent") is None:
+                print(f"skipping {mode}: not installed")
+                continue
+            port = free_port()
+            process = start_server(mode, port, workers, env)
+            try:
+                for name, (_, urls) in workloads.items():
+                    fetch(port, urls[0])
+                results["modes"][mode] = load(port, clients, slow, duration, rate)
+            finally:
+                process.terminate()
+                process.wait(30)
+            report(mode, results["modes"][mode])
+    return results
+
+
+def report(mode, result):
+    print(f"{mode}: {result['throughput']:.1f} req/s over {result['elapsed']:.1f}s")
+    for name, item in result["workloads"].items():
+        p50, p99 = (f"{v * 1e3:9.1f}ms" if v is not None else "        -  " for v in (item["p50"], item["p99"]))
+        print(f"  {name:<14} n={item['requests']:<6} errors={item['errors']:<4} "
+              f"p50={p50} p99={p99} {item['mb']:9.1f}MB")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--modes", default=",".join(default_modes))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--slow", type=int, default=4, help="clients downloading at --rate bytes/s")
+    parser.add_argument("--rate", type=float, default=4.0e6)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--latency", type=float, default=0.25, help="upstream delay of the GitHub stub")
+    parser.add_argument("--size", type=int, default=16, help="large download size in MB")
+    parser.add_argument("--save", help="write results to this JSON file")
+    args = parser.parse_args()
+    results = run(
+        args.modes.split(","), args.workers, args.clients, args.slow, args.duration,
+        args.latency, args.size, args.rate
+    )
+    if args.save:
+        Path(args.save).write_text(dumps(results, indent=4))
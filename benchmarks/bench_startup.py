@@ -0,0 +1,92 @@
+from pathlib import Path
+from subprocess import run as run_process, PIPE
+from statistics import median
+from time import perf_counter
+from json import loads, dumps
+import sys
+home = Path(__file__).parent.parent
+probe = """
+from time import perf_counter
+from json import dumps
+start = perf_counter()
+from app import create_app
+imported = perf_counter()
+app = create_app()
+created = perf_counter()
+response = app.test_client().get({url!r})
+assert response.status_code == 200, response.status_code
+served = perf_counter()
+print(dumps(dict(imports=imported - start, create_app=created - imported, first_request=served - created)))
+"""
+
+
+def importtime(top=15):
+    # Same data as `python -X importtime`, folded to the slowest top-level imports.
+    err = run_process(
+        [sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+        cwd=str(home), stderr=PIPE, stdout=PIPE, check=True, text=True
+    ).stderr
+    modules = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            modules.append((int(cumulative) * 1.0e-6, int(own) * 1.0e-6, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def first_request(url="/", repeat=5):
+    runs = []
+    for _ in range(repeat):
+        start = perf_counter()
+        out = run_process(
+            [sys.executable, "-c", probe.format(url=url)],
+            cwd=str(home), stdout=PIPE, check=True, text=True
+        ).stdout
+        phases = loads(out.strip().splitlines()[-1])
+        phases["process"] = perf_counter() - start
+        runs.append(phases)
+    return {key: median(run[key] for run in runs) for key in runs[0]}
+
+
+def compare(result, path, threshold):
+    try:
+        previous = loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return True
+    ok = True
+    for key, value in result.items():
+        before = previous.get(key)
+        if before:
+            change = value / before - 1.0
+            flag = " REGRESSION" if change > threshold else ""
+            ok = ok and not flag
+            print(f"  {key:<14} {before * 1e3:8.1f}ms -> {value * 1e3:8.1f}ms ({change:+.0%}){flag}")
+    return ok
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--url", default="/")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", help="write the medians to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    print("slowest imports (cumulative / self)")
+    for cumulative, own, name in importtime(args.top):
+        print(f"  {cumulative * 1e3:8.1f}ms {own * 1e3:8.1f}ms  {name}")
+    result = first_request(args.url, args.repeat)
+    print("time to first request (median)")
+    for key, value in result.items():
+        print(f"  {key:<14} {value * 1e3:8.1f}ms")
+    if args.compare:
+        print(f"compared with {args.compare}")
+        if not compare(result, args.compare, args.threshold):
+            sys.exit(1)
+    if args.save:
+        Path(args.save).write_text(dumps(result, indent=4))
@@ -0,0 +1,110 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from hashlib import md5
+from urllib.parse import quote
+from time import sleep
+import re
+page_route = re.compile(r"^/circuitalmynds/music_([^/]+)/tree/main/videos/?$")
+
+
+def video_names(ident, count):
+    return [
+        f"Artist {ident} {i:05d} - Track #{i} (Live)-{md5(f'{ident}{i}'.encode()).hexdigest()[:11]}.mp4"
+        for i in range(count)
+    ]
+
+
+def github_page(ident, count):
+    rows = "\n".join(
+        f'''<div role="row" class="Box-row">
+  <div role="gridcell"><svg aria-label="File"></svg></div>
+  <div role="rowheader"><span><a class="js-navigation-open Link--primary" title="{name}" href="/circuitalmynds/music_{ident}/blob/main/videos/{quote(name)}">{name}</a></span></div>
+  <div role="gridcell"><a href="/circuitalmynds/music_{ident}/commit/{i:040x}" class="Link--secondary">add videos</a></div>
+</div>'''
+        for i, name in enumerate(video_names(ident, count))
+    )
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>music_{ident}/videos</title>
+<link rel="stylesheet" href="/assets/github.css"></head>
+<body class="logged-out env-production page-responsive">
+<header><a href="/" class="octicon">GitHub</a><a href="/features">Features</a></header>
+<main><div class="js-details-container Details">
+{rows}
+</div></main>
+<footer><a href="/site/terms">Terms</a><a href="/site/privacy">Privacy</a></footer>
+</body>
+</html>'''
+
+
+class FakeGitHub:
+
+    def __init__(self, count=50, latency=0.0, counts=None):
+        self.count = count
+        self.counts = counts or dict()
+        self.latency = latency
+        self.pages = dict()
+        self.hits = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server.server_address)
+
+    def page(self, ident):
+        if ident not in self.pages:
+            body = github_page(ident, self.counts.get(ident, self.count)).encode()
+            self.pages[ident] = (body, f'W/"{md5(body).hexdigest()}"')
+        return self.pages[ident]
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake.hits += 1
+                if fake.latency:
+                    sleep(fake.latency)
+                match = page_route.match(self.path)
+                if not match:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, etag = fake.page(match.group(1))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
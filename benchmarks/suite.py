@@ -0,0 +1,188 @@
+from benchmarks.fixtures import FakeGitHub, video_names
+from tempfile import TemporaryDirectory
+from statistics import median
+from pathlib import Path
+from time import perf_counter, time
+from json import dumps, loads
+from os import environ, truncate
+import platform
+import sys
+default_sizes = (10, 1000)
+
+
+def touch(path, size=0):
+    # Sparse files: the tree has realistic sizes without using the disk.
+    path.touch()
+    if size:
+        truncate(str(path), size)
+
+
+def build_tree(root, count):
+    home, drive = root.joinpath("home"), root.joinpath("drive")
+    videos = home.joinpath("Videos", "containers", "c0", "videos")
+    pictures = home.joinpath("Pictures", "containers", "p0")
+    for folder in (videos, pictures, home.joinpath("Videos", "handler", "rejected")):
+        folder.mkdir(parents=True, exist_ok=True)
+    for i, name in enumerate(video_names("c0", count)):
+        touch(videos.joinpath(name), (i % 90 + 1) * 10 ** 5)
+    waiting = home.joinpath("Videos", "handler", "waiting")
+    waiting.mkdir(parents=True, exist_ok=True)
+    for i, name in enumerate(video_names("w", max(1, count // 10))):
+        touch(waiting.joinpath(name), (i % 90 + 1) * 10 ** 5)
+    for i in range(count):
+        touch(pictures.joinpath(f"album-{i % 10}-{i:06d}.jpg"), 2 * 10 ** 4 + i)
+    for name in ("documents", "videos", "pictures"):
+        folder = drive.joinpath("storage", name)
+        folder.mkdir(parents=True)
+        for i in range(max(1, count // 3)):
+            touch(folder.joinpath(f"{name}-{i:06d}.bin"), 10 ** 3 + i)
+    drive.joinpath("trash").mkdir()
+    data = root.joinpath("data")
+    data.joinpath("videos").mkdir(parents=True)
+    rows = "\n".join(f"{i},{name},{i * 1000}" for i, name in enumerate(video_names("csv", count)))
+    data.joinpath("table.csv").write_text(f"id,name,size\n{rows}\n")
+    data.joinpath("table.json").write_text(dumps([
+        dict(id=i, name=name, size=i * 1000) for i, name in enumerate(video_names("json", count))
+    ]))
+    return home, drive, data
+
+
+def measure(func, repeat=5, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return dict(best=min(timings), median=median(timings), repeat=repeat)
+
+
+def request(client, url):
+    def call():
+        with client.get(url) as response:
+            assert response.status_code == 200, f"{url} -> {response.status_code}"
+            response.data
+    return call
+
+
+def cases(count, repeat):
+    from module.utils import get_files, opencsv, getjson
+    from container import Videos, folder_data
+    from container.probe import fields
+    from drive.build import Folder
+    from app import create_app
+    Videos.ids.ensure()
+    videos = Videos()
+    documents = Folder("storage/documents")
+    client = create_app(views=["main", "admin", "container", "drive"]).test_client()
+    # Sparse files have nothing to probe; seed the cache so no ffmpeg pass
+    # runs in the background during the timings.
+    Videos.probe.store([
+        dict(path=str(path), size=st.st_size, mtime=st.st_mtime_ns, **{i: None for i in fields})
+        for path, st in ((p, p.stat()) for p in Videos.path.joinpath("c0", "videos").iterdir())
+    ])
+
+    def cold_git():
+        Videos.cache.invalidate("c0")
+        Videos.scraper.get_validators().pop("c0", None)
+        folder_data.joinpath("videos", "c0.json").unlink(missing_ok=True)
+
+    results = dict(
+        get_folder_cold=measure(
+            lambda: videos.get_folder("c0"), repeat, lambda: Videos.index.invalidate("c0", True)
+        ),
+        get_folder_warm=measure(lambda: videos.get_folder("c0"), repeat),
+        handler_files=measure(lambda: Videos.handler_files(), repeat),
+        git_content_cold=measure(lambda: videos.git_content("c0"), repeat, cold_git),
+        git_content_warm=measure(lambda: videos.git_content("c0"), repeat),
+        drive_getdata=measure(documents.getdata, repeat),
+        get_files=measure(lambda: get_files(Videos.path.joinpath("c0", "videos")), repeat),
+        opencsv=measure(lambda: opencsv(folder_data.joinpath("table.csv")), repeat),
+        getjson=measure(lambda: getjson(folder_data.joinpath("table.json")), repeat)
+    )
+    assert len(videos.git_content("c0")) == count
+    routes = dict(
+        main="/",
+        admin="/admin/metrics/?format=json",
+        container_videos="/container/videos/",
+        container_folder="/container/videos/c0/",
+        container_pictures="/container/pictures/p0/?limit=100",
+        drive_documents="/drive/documents/",
+        drive_stats="/drive/stats/"
+    )
+    for name, url in routes.items():
+        results[f"http_{name}"] = measure(request(client, url), repeat)
+    return results
+
+
+def run_size(count, repeat):
+    # Each size runs in a fresh interpreter so module-level state starts clean.
+    from subprocess import run as run_process, PIPE
+    with TemporaryDirectory() as tmp, FakeGitHub(count=count) as server:
+        home, drive, data = build_tree(Path(tmp), count)
+        env = dict(
+            environ, HOME=str(home), **{
+                "GIT-URL": server.url, "DRIVE-ROOT": str(drive),
+                "CONTAINER-DATA": str(data)
+            }
+        )
+        out = run_process(
+            [sys.executable, "-m", "benchmarks.suite", "--child", str(count), str(repeat)],
+            env=env, cwd=str(Path(__file__).parent.parent), stdout=PIPE, check=True, text=True
+        ).stdout
+        return loads(out.strip().splitlines()[-1])
+
+
+def run(sizes=default_sizes, repeat=5):
+    return dict(
+        meta=dict(
+            time=time(), python=platform.python_version(), machine=platform.machine(),
+            sizes=list(sizes), repeat=repeat
+        ),
+        results={str(count): run_size(count, repeat) for count in sizes}
+    )
+
+
+def compare(current, previous, threshold=0.2):
+    regressions = []
+    for size, cases_ in current["results"].items():
+        before = previous.get("results", {}).get(size, {})
+        for name, result in cases_.items():
+            if name in before and before[name]["median"]:
+                change = result["median"] / before[name]["median"] - 1.0
+                if change > threshold:
+                    regressions.append((size, name, before[name]["median"], result["median"], change))
+    return regressions
+
+
+def report(results):
+    for size, cases_ in results["results"].items():
+        print(f"files={size}")
+        for name, result in cases_.items():
+            print(f"  {name:<22} best={result['best'] * 1e3:9.3f}ms median={result['median'] * 1e3:9.3f}ms")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        print(dumps(cases(int(sys.argv[2]), int(sys.argv[3]))))
+        sys.exit(0)
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(map(str, default_sizes)),
+                        help="comma-separated file counts, e.g. 10,1000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    results = run([int(s) for s in args.sizes.split(",")], args.repeat)
+    report(results)
+    if args.save:
+        Path(args.save).write_text(dumps(results, indent=4))
+    if args.compare:
+        regressions = compare(results, loads(Path(args.compare).read_text()), args.threshold)
+        for size, name, before, after, change in regressions:
+            print(f"REGRESSION files={size} {name}: {before * 1e3:.3f}ms -> {after * 1e3:.3f}ms ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
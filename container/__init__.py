@@ -1,107 +1,160 @@
-from module.utils import getjson, save_json, CLI
-from bs4 import BeautifulSoup
-from requests import get
-from os.path import join
+from module.utils import save_json, CLI
+from module.scanner import scan
+from module.metrics import timed
+from .index import FolderIndex, ContainerIds
+from .scraper import GitScraper
+from .cache import JsonCache
+from .planner import first_fit_decreasing
+from .probe import ProbeCache
+from .thumbs import ThumbCache
+from .pictures import PictureIndex
+from threading import Lock
 from pathlib import Path
 env = CLI.env["app-env"]
-folder_data = Path(__file__).parent.joinpath("data")
+folder_data = Path(env.get("CONTAINER-DATA") or Path(__file__).parent.joinpath("data"))
 home_path = Path(CLI.env["shell-env"]["HOME"])
+thumbs = ThumbCache(folder_data.joinpath("thumbs"))
+
+
+def video_data(name, size, path):
+    return dict(
+        name=name,
+        id=name.split(".mp4")[0][-11:],
+        size=size * 1.0e-6,
+        path=path
+    )
 
 
 class Videos:
     path = home_path.joinpath("Videos/containers")
-    ids = sorted([i.name for i in path.iterdir() if i.is_dir()])
+    ids = ContainerIds(path, "videos", folder_data.joinpath("index/videos-ids.json"))
     route = "/containers/videos/"
+    handler = None
+    index = FolderIndex(
+        path, folder_data.joinpath("index/videos"), "videos",
+        build=lambda ident, files: Videos.folder_info(ident, files)
+    )
+    scraper = GitScraper(
+        env["GIT-URL"], folder_data.joinpath("videos"),
+        folder_data.joinpath("index/videos-validators.json")
+    )
+    probe = ProbeCache(folder_data.joinpath("index/probe.sqlite3"))
+    cache = JsonCache(
+        folder_data.joinpath("videos"), lambda ident: Videos.scraper.fetch(ident)
+    )
 
     @staticmethod
     def url_content(ident):
         return f"{env['GIT-URL']}/circuitalmynds/music_{ident}/blob/main/videos"
 
-    def get_folder(self, ident):
+    @staticmethod
+    def folder_info(ident, files):
         info = dict(
             available_space=True,
             total_size=0.0,
             content=[],
             ready_to_push=True
         )
-        if ident in self.ids:
-            path = Videos.path.joinpath(ident)
-            jsonpath = path.joinpath("info.json")
-            files = list(path.joinpath("videos").iterdir())
-            for file in files:
-                datafile = dict(
-                    name=file.name,
-                    id=file.name.split(".mp4")[0][-11:],
-                    size=file.stat().st_size * 1.0e-6,
-                    path=str(file.relative_to(home_path.joinpath(
-                        "Videos/containers"
-                    ))),
-                    url=f"{Videos.url_content(ident)}/{file.name}?raw=true"
-                )
-                info["content"].append(datafile)
-                info["total_size"] += datafile["size"]
-            if info["total_size"] > 9.5e2:
-                info["available_space"] = False
-                if info["total_size"] > 1.05e3:
+        folder = Videos.path.joinpath(ident, "videos")
+        metadata = Videos.probe.lookup({
+            str(folder.joinpath(name)): (size, mtime)
+            for name, (_, size, mtime) in files.items()
+        })
+        for name, (_, size, _) in files.items():
+            datafile = video_data(name, size, f"{ident}/videos/{name}")
+            datafile["url"] = f"{Videos.url_content(ident)}/{name}?raw=true"
+            datafile.update(metadata.get(str(folder.joinpath(name)), {}))
+            info["content"].append(datafile)
+            info["total_size"] += datafile["size"]
+        if info["total_size"] > 9.5e2:
+            info["available_space"] = False
+            if info["total_size"] > 1.05e3:
+                info["ready_to_push"] = False
+            for x in info["content"]:
+                if x.get("size") > 95.0:
                     info["ready_to_push"] = False
-                for x in info["content"]:
-                    if x.get("size") > 95.0:
-                        info["ready_to_push"] = False
-            save_json(jsonpath, info, ensure_ascii=True)
-            return getjson(jsonpath)
-        else:
-            return info
+        return info
 
-    def git_content(self, ident):
-        content = []
+    @timed("videos.get_folder")
+    def get_folder(self, ident):
+        if ident in self.ids:
+            info, changed = self.index.get(ident)
+            if info is not None:
+                jsonpath = Videos.path.joinpath(ident, "info.json")
+                if changed or not jsonpath.exists():
+                    save_json(jsonpath, info, lock=True, ensure_ascii=True)
+                return info
+        return self.folder_info(ident, {})
 
+    @timed("videos.git_content")
+    def git_content(self, ident):
         if ident in self.ids:
-            jsonfile = folder_data.joinpath(f"videos/{ident}.json")
-            if not jsonfile.exists():
-                page_url = join(env["GIT-URL"], f"circuitalmynds/music_{ident}/tree/main/videos")
-                page_data = get(page_url).text
-                links = list(filter(
-                    lambda a: a.get("href").endswith(".mp4"),
-                    BeautifulSoup(page_data, "html.parser").find("body").findAll("a")
-                ))
-                for i in links:
-                    content.append(dict(
-                        name=i.get("title"),
-                        url=f'{env["GIT-URL"]}{i.get("href")}?raw=true'
-                    ))
-                save_json(jsonfile, content, ensure_ascii=True)
-            content = getjson(jsonfile)
-        return content
+            content = self.cache.get(ident)
+            if content is not None:
+                return content
+        return []
 
     @staticmethod
-    def handler_files():
-        jsonpath = folder_data.joinpath("videos-handler-files.json")
-        path = home_path.joinpath("Videos/handler")
-        waiting, rejected = [], []
-        for file in list(path.joinpath("waiting").iterdir()):
-            waiting.append(dict(
-                name=file.name,
-                id=file.name.split(".mp4")[0][-11:],
-                size=file.stat().st_size * 1.0e-6,
-                path=str(file)
-                )
-            )
-        for file in list(path.joinpath("rejected").iterdir()):
-            rejected.append(dict(
-                name=file.name,
-                id=file.name.split(".mp4")[0][-11:],
-                size=file.stat().st_size * 1.0e-6,
-                path=str(file)
-                )
-            )
-        files = dict(waiting=waiting, rejected=rejected)
-        save_json(
-            jsonpath, files, ensure_ascii=True
+    def iter_handler(folder, workers=None):
+        return scan(
+            home_path.joinpath("Videos/handler", folder),
+            lambda entry, st: video_data(entry.name, st.st_size, entry.path),
+            workers
         )
+
+    @classmethod
+    def handler_files(cls, workers=None):
+        files = {
+            folder: list(cls.iter_handler(folder, workers))
+            for folder in ("waiting", "rejected")
+        }
+        if files != cls.handler:
+            save_json(
+                folder_data.joinpath("videos-handler-files.json"), files,
+                lock=True, ensure_ascii=True
+            )
+            cls.handler = files
         return files
 
+    def push_plan(self, limit=None, new_containers=True):
+        containers = {
+            ident: self.get_folder(ident)["total_size"] for ident in self.ids
+        }
+        return first_fit_decreasing(
+            containers, self.handler_files()["waiting"], limit, new_containers
+        )
+
+
+Videos.ids.listeners.append(Videos.index.invalidate)
+Videos.probe.listeners.append(lambda paths: [
+    Videos.index.invalidate(ident, True) for ident in {
+        Path(i).relative_to(Videos.path).parts[0] for i in paths
+    }
+])
+
 
 class Pictures:
     path = home_path.joinpath("Pictures/containers")
-    ids = sorted([i.name for i in path.iterdir() if i.is_dir()])
+    ids = ContainerIds(path, store=folder_data.joinpath("index/pictures-ids.json"))
     route = "/containers/pictures/"
+    indexes = dict()
+    lock = Lock()
+
+    @classmethod
+    def get_folder(cls, ident):
+        if ident not in cls.ids:
+            return None
+        index = cls.indexes.get(ident)
+        if index is None:
+            with cls.lock:
+                index = cls.indexes.get(ident)
+                if index is None:
+                    index = cls.indexes[ident] = PictureIndex(cls.path.joinpath(ident))
+        return index
+
+    @classmethod
+    def invalidate(cls, ident):
+        cls.indexes.pop(ident, None)
+
+
+Pictures.ids.listeners.append(Pictures.invalidate)
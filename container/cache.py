@@ -0,0 +1,198 @@
+from module.utils import getjson
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, Counter
+from threading import Lock
+from pathlib import Path
+from time import time
+from os import scandir, utime, remove
+
+
+class JsonCache:
+    ttl = 6 * 3600.0
+    stale = 24 * 3600.0
+    negative_ttl = 600.0
+    capacity = 128
+    max_bytes = 256 * 1024 ** 2
+    workers = 2
+
+    def __init__(self, folder, loader, **opts):
+        self.folder = Path(str(folder))
+        self.loader = loader
+        for key in ("ttl", "stale", "negative_ttl", "capacity", "max_bytes", "workers"):
+            setattr(self, key, opts.get(key, getattr(self, key)))
+        self.memory = OrderedDict()
+        self.missing = dict()
+        self.pending = set()
+        self.disk = None
+        self.counters = Counter()
+        self.pool = None
+        self.lock = Lock()
+
+    def path(self, ident):
+        return self.folder.joinpath(f"{ident}.json")
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counters[key] += n
+
+    def get(self, ident):
+        now = time()
+        missing = self.missing.get(ident)
+        if missing is not None and now - missing < self.negative_ttl:
+            self.count("negative")
+            return None
+        entry = self.lookup(ident)
+        if entry is not None:
+            age = now - entry["fetched"]
+            if age < self.ttl:
+                self.count("hits")
+                return entry["content"]
+            if age < self.ttl + self.stale:
+                self.count("stale")
+                self.revalidate(ident)
+                return entry["content"]
+        self.count("misses")
+        return self.load(ident, entry)
+
+    def lookup(self, ident):
+        with self.lock:
+            entry = self.memory.get(ident)
+            if entry is not None:
+                self.memory.move_to_end(ident)
+                return entry
+        jsonfile = self.path(ident)
+        try:
+            entry = dict(fetched=jsonfile.stat().st_mtime, content=getjson(jsonfile))
+        except (OSError, ValueError):
+            return None
+        self.remember(ident, entry)
+        return entry
+
+    def load(self, ident, entry=None):
+        try:
+            report = self.loader(ident)
+        except Exception:
+            report = dict(status=None)
+        return self.store(ident, report, entry)
+
+    def store(self, ident, report, entry=None):
+        status = report.get("status")
+        if status == 404:
+            self.count("not_found")
+            with self.lock:
+                self.missing[ident] = time()
+                self.memory.pop(ident, None)
+            return None
+        if status in (200, 304) and report.get("content") is not None:
+            self.missing.pop(ident, None)
+            fresh = dict(fetched=time(), content=report["content"])
+            self.touch(ident)
+            self.remember(ident, fresh)
+            self.evict()
+            return fresh["content"]
+        self.count("errors")
+        return entry["content"] if entry else []
+
+    def revalidate(self, ident):
+        with self.lock:
+            if ident in self.pending:
+                return
+            self.pending.add(ident)
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="cache")
+        self.count("refreshes")
+        self.pool.submit(self.background, ident)
+
+    def background(self, ident):
+        try:
+            self.load(ident, self.memory.get(ident))
+        finally:
+            with self.lock:
+                self.pending.discard(ident)
+
+    def remember(self, ident, entry):
+        with self.lock:
+            self.memory[ident] = entry
+            self.memory.move_to_end(ident)
+            while len(self.memory) > self.capacity:
+                self.memory.popitem(last=False)
+
+    def touch(self, ident):
+        # A 304 keeps the file as it is, its mtime is what marks it fresh again.
+        jsonfile = self.path(ident)
+        try:
+            utime(jsonfile)
+            size = jsonfile.stat().st_size
+        except OSError:
+            return
+        with self.lock:
+            if self.disk is not None:
+                self.disk[ident] = size
+
+    def sizes(self):
+        if self.disk is None:
+            disk = dict()
+            try:
+                with scandir(self.folder) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json") and entry.is_file():
+                            disk[entry.name[:-5]] = entry.stat().st_size
+            except FileNotFoundError:
+                pass
+            with self.lock:
+                if self.disk is None:
+                    self.disk = disk
+        return self.disk
+
+    def evict(self):
+        disk = self.sizes()
+        with self.lock:
+            total = sum(disk.values())
+            if total <= self.max_bytes:
+                return
+            order = sorted(
+                (i for i in disk if i not in self.memory), key=self.mtime
+            ) + [i for i in self.memory if i in disk]
+            evicted = []
+            for ident in order:
+                if total <= self.max_bytes:
+                    break
+                total -= disk.pop(ident)
+                self.memory.pop(ident, None)
+                evicted.append(ident)
+            self.counters["evictions"] += len(evicted)
+        for ident in evicted:
+            try:
+                remove(self.path(ident))
+            except OSError:
+                pass
+
+    def mtime(self, ident):
+        try:
+            return self.path(ident).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def invalidate(self, ident=None):
+        with self.lock:
+            if ident is None:
+                self.memory.clear()
+                self.missing.clear()
+            else:
+                self.memory.pop(ident, None)
+                self.missing.pop(ident, None)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            lookups = sum(counters.get(i, 0) for i in ("hits", "stale", "negative", "misses"))
+            return dict(
+                counters=counters,
+                hit_ratio=(lookups - counters.get("misses", 0)) / lookups if lookups else 0.0,
+                memory_entries=len(self.memory),
+                negative_entries=len(self.missing),
+                pending=len(self.pending),
+                disk_bytes=sum(self.disk.values()) if self.disk is not None else None,
+                ttl=self.ttl, stale=self.stale,
+                negative_ttl=self.negative_ttl, max_bytes=self.max_bytes
+            )
@@ -0,0 +1,239 @@
+from module.utils import getjson, save_json
+from module.watcher import Watcher, iter_dirs
+from module.scanner import iter_files
+from collections import OrderedDict
+from threading import Lock
+from pathlib import Path
+from time import monotonic
+from os import scandir, stat
+
+
+class FolderIndex:
+    capacity = 64
+    fresh = 2.0
+
+    def __init__(self, root, store, subfolder=None, build=None, **opts):
+        self.root = Path(str(root))
+        self.store = Path(str(store))
+        self.subfolder = subfolder
+        self.build = build or (lambda ident, files: files)
+        self.capacity = opts.get("capacity", self.capacity)
+        self.fresh = opts.get("fresh", self.fresh)
+        self.cache = OrderedDict()
+        self.dirty = set()
+        self.stale = set()
+        self.lock = Lock()
+
+    def folder(self, ident):
+        path = self.root.joinpath(ident)
+        return path.joinpath(self.subfolder) if self.subfolder else path
+
+    def get(self, ident, full=False):
+        now = monotonic()
+        with self.lock:
+            if ident in self.stale:
+                self.stale.discard(ident)
+                full = True
+            hit = self.cache.get(ident)
+            if hit and not full and now - hit["checked"] < self.fresh:
+                self.cache.move_to_end(ident)
+                return hit["info"], False
+        try:
+            mtime = stat(self.folder(ident)).st_mtime_ns
+        except FileNotFoundError:
+            self.invalidate(ident)
+            return None, False
+        if hit and not full and hit["mtime"] == mtime:
+            self.remember(ident, mtime, hit["info"], now)
+            return hit["info"], False
+        record = self.load(ident)
+        changed = record is None or record["mtime"] != mtime or full
+        if not changed and hit is None:
+            # Nothing watched the folder before this load: files may have
+            # grown in place since the record was written.
+            changed = not self.verify(self.folder(ident), record["files"])
+        if changed:
+            files = self.rescan(self.folder(ident))
+            changed = record is None or files != record["files"]
+            record = dict(mtime=mtime, files=files)
+            self.save(ident, record)
+        with self.lock:
+            if ident in self.dirty:
+                self.dirty.discard(ident)
+                changed = True
+        info = self.build(ident, record["files"])
+        self.remember(ident, mtime, info, now)
+        return info, changed
+
+    @staticmethod
+    def rescan(path):
+        # Every entry is stat'ed: the inode alone misses files that grew in place.
+        content = dict()
+        for entry in iter_files(path):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            content[entry.name] = [st.st_ino, st.st_size, st.st_mtime_ns]
+        return dict(sorted(content.items()))
+
+    @staticmethod
+    def verify(path, files):
+        for name, (ino, size, mtime) in files.items():
+            try:
+                st = stat(path.joinpath(name))
+            except OSError:
+                return False
+            if (st.st_ino, st.st_size, st.st_mtime_ns) != (ino, size, mtime):
+                return False
+        return True
+
+    def load(self, ident):
+        jsonpath = self.store.joinpath(f"{ident}.json")
+        if jsonpath.is_file():
+            try:
+                return getjson(jsonpath)
+            except ValueError:
+                return None
+        return None
+
+    def save(self, ident, record):
+        self.store.mkdir(parents=True, exist_ok=True)
+        save_json(self.store.joinpath(f"{ident}.json"), record, indent=None)
+
+    def remember(self, ident, mtime, info, checked):
+        with self.lock:
+            self.cache[ident] = dict(mtime=mtime, info=info, checked=checked)
+            self.cache.move_to_end(ident)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+
+    def invalidate(self, ident=None, dirty=False):
+        # The next get() rescans: watcher events for files written in place
+        # leave the directory mtime alone.
+        with self.lock:
+            idents = list(self.cache) if ident is None else [ident]
+            for i in idents:
+                self.cache.pop(i, None)
+                self.stale.add(i)
+                if dirty:
+                    self.dirty.add(i)
+
+
+class ContainerIds:
+
+    def __init__(self, root, subfolder=None, store=None, **opts):
+        self.root = Path(str(root))
+        self.subfolder = subfolder
+        self.store = Path(str(store)) if store else None
+        self.watcher = Watcher(self.refresh, opts.get("interval"), opts.get("polling", False))
+        self.listeners = []
+        self.lookup = frozenset()
+        self.sizes = dict()
+        self.dirs = dict()
+        self.view = dict(folders=[], sizes={}, total_size=0.0)
+        self.lock = Lock()
+
+    def __contains__(self, ident):
+        return ident in self.ensure().lookup
+
+    def __iter__(self):
+        return iter(self.snapshot()["folders"])
+
+    def __len__(self):
+        return len(self.snapshot()["folders"])
+
+    def snapshot(self):
+        return self.ensure().view
+
+    def ensure(self):
+        if not self.watcher.running():
+            with self.lock:
+                if not self.watcher.running():
+                    self.watcher.start()
+                    self.load()
+        return self
+
+    def folder(self, ident):
+        path = self.root.joinpath(ident)
+        return path.joinpath(self.subfolder) if self.subfolder else path
+
+    def scan(self):
+        try:
+            with scandir(self.root) as entries:
+                return {
+                    i.name for i in entries
+                    if i.is_dir() and not i.name.startswith(".")
+                }
+        except FileNotFoundError:
+            return set()
+
+    def measure(self, ident):
+        size, signature, dirs = 0, 0, [str(self.root.joinpath(ident))]
+        for path in iter_dirs(self.folder(ident)):
+            try:
+                with scandir(path) as entries:
+                    signature = max(signature, stat(path).st_mtime_ns)
+                    size += sum(
+                        i.stat().st_size for i in entries
+                        if i.is_file() and not i.name.startswith(".")
+                    )
+            except OSError:
+                continue
+            dirs.append(str(path))
+        return size * 1.0e-6, signature, dirs
+
+    def load(self):
+        # Sizes are measured again on boot: a stored signature of directory
+        # mtimes misses files that grew in place, and one that covers every
+        # file costs the same stat calls as measuring.
+        self.watcher.watch(self.root)
+        sizes, self.dirs = dict(), dict()
+        for ident in self.scan():
+            size, signature, self.dirs[ident] = self.measure(ident)
+            sizes[ident] = [size, signature]
+            self.watcher.watch(*self.dirs[ident])
+        self.publish(sizes)
+
+    def refresh(self, paths):
+        idents, rescan = set(), False
+        for path in paths:
+            try:
+                parts = Path(path).relative_to(self.root).parts
+            except ValueError:
+                continue
+            if parts:
+                idents.add(parts[0])
+            else:
+                rescan = True
+        with self.lock:
+            sizes = dict(self.sizes)
+            if rescan:
+                names = self.scan()
+                idents.update(names.symmetric_difference(sizes))
+            else:
+                names = set(sizes)
+            for ident in idents:
+                self.watcher.unwatch(*self.dirs.pop(ident, []))
+                if ident in names:
+                    size, signature, self.dirs[ident] = self.measure(ident)
+                    sizes[ident] = [size, signature]
+                    self.watcher.watch(*self.dirs[ident])
+                else:
+                    sizes.pop(ident, None)
+            self.publish(sizes)
+        for ident in idents:
+            for listener in self.listeners:
+                listener(ident)
+
+    def publish(self, sizes):
+        self.sizes = sizes
+        self.lookup = frozenset(sizes)
+        self.view = dict(
+            folders=sorted(sizes),
+            sizes={k: v[0] for k, v in sorted(sizes.items())},
+            total_size=sum(v[0] for v in sizes.values())
+        )
+        if self.store:
+            self.store.parent.mkdir(parents=True, exist_ok=True)
+            save_json(self.store, dict(sizes=sizes), indent=None)
@@ -0,0 +1,97 @@
+from html.parser import HTMLParser
+from codecs import getincrementaldecoder
+backends = ("html.parser", "lxml")
+
+
+class LinkParser(HTMLParser):
+
+    def __init__(self, suffix=".mp4"):
+        super().__init__(convert_charrefs=True)
+        self.suffix = suffix
+        self.in_body = False
+        self.found = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.in_body = True
+        elif tag == "a" and self.in_body:
+            attrs = dict(attrs)
+            href = attrs.get("href")
+            if href and href.endswith(self.suffix):
+                self.found.append((attrs.get("title"), href))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "body":
+            self.in_body = False
+
+    def links(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+            yield from self.found
+            self.found.clear()
+        self.close()
+        yield from self.found
+        self.found.clear()
+
+
+def lxml_links(chunks, suffix=".mp4"):
+    from lxml.etree import HTMLPullParser
+    parser = HTMLPullParser(events=("start", "end"))
+    in_body = False
+
+    def events():
+        nonlocal in_body
+        for event, element in parser.read_events():
+            if element.tag == "body":
+                in_body = event == "start"
+            elif event == "start" and element.tag == "a" and in_body:
+                href = element.get("href")
+                if href and href.endswith(suffix):
+                    yield element.get("title"), href
+            elif event == "end" and in_body:
+                # Drop what was already seen so the tree never grows with the page.
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from events()
+    parser.close()
+    yield from events()
+
+
+def get_backend(name=None):
+    if name == "lxml":
+        try:
+            import lxml.etree
+            return "lxml"
+        except ImportError:
+            pass
+    return "html.parser"
+
+
+def iter_links(chunks, suffix=".mp4", backend=None):
+    if isinstance(chunks, (str, bytes)):
+        chunks = (chunks,)
+    chunks = iter_text(chunks)
+    if get_backend(backend) == "lxml":
+        return lxml_links(chunks, suffix)
+    return LinkParser(suffix).links(chunks)
+
+
+def iter_text(chunks, encoding="utf-8"):
+    decoder = None
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            decoder = decoder or getincrementaldecoder(encoding)(errors="replace")
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
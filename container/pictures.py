@@ -1,61 +1,111 @@
-from module.utils import getjson, save_json
+from module.scanner import iter_files
+from bisect import bisect_left, bisect_right
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from array import array
+from json import dumps, loads
+from time import strftime, localtime
 from pathlib import Path
-giturl = "https://github.com"
-gituser = "alanmatzumiya"
+from .thumbs import extensions
+sorts = ("name", "size", "mtime")
 
 
-class Pictures:
-    folder_data = Path(__file__).parent.joinpath("data/pictures")
-    ids = sorted(
-        i for i in Path.home().joinpath(
-            "Pictures/containers"
-        ) if i.is_dir()
-    )
+class CursorError(ValueError):
+    pass
 
-    def __init__(self, ident):
-        self.id = ident
-        self.name = f"pictures_{ident}"
-        self.url = f"{giturl}/{gituser}/{self.name }"
-        self.content = []
-        self.totalsize = 0.0
 
-    def getdata(self):
-        jsonfile = self.folder_data.joinpath(f"{self.id}.json")
-        if jsonfile.exists():
-            self.content = getjson(jsonfile)
+def encode_cursor(sort, order, key):
+    return urlsafe_b64encode(dumps([sort, order, key]).encode()).decode().rstrip("=")
 
 
+def decode_cursor(cursor, sort, order):
+    try:
+        data = loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = data[2] if sort == "name" else (int(data[2][0]), str(data[2][1]))
+    except (ValueError, TypeError, IndexError, KeyError):
+        raise CursorError("invalid cursor")
+    if data[:2] != [sort, order] or (sort == "name" and not isinstance(key, str)):
+        raise CursorError("cursor does not match sort and order")
+    return key
 
 
-    def git_content(self, ident):
-            content = []
+class PictureIndex:
 
-            if ident in self.ids:
-                jsonfile = folder_data.joinpath(f"videos/{ident}.json")
-                if not jsonfile.exists():
-                    page_url = join(env["GIT-URL"], f"circuitalmynds/music_{ident}/tree/main/videos")
-                    page_data = get(page_url).text
-                    links = list(filter(
-                        lambda a: a.get("href").endswith(".mp4"),
-                        BeautifulSoup(page_data, "html.parser").find("body").findAll("a")
-                    ))
-                    for i in links:
-                        content.append(dict(
-                            name=i.get("title"),
-                            url=f'{env["GIT-URL"]}{i.get("href")}?raw=true'
-                        ))
-                    save_json(jsonfile, content, ensure_ascii=True)
-                content = getjson(jsonfile)
-            return content
+    def __init__(self, root):
+        self.root = Path(str(root))
+        entries = sorted(
+            (str(Path(entry.path).relative_to(self.root)), st.st_size, int(st.st_mtime))
+            for entry, st in (
+                (i, i.stat()) for i in iter_files(self.root, recursive=True, hidden=False)
+                if i.name.lower().endswith(extensions["pictures"])
+            )
+        )
+        self.names = [i[0] for i in entries]
+        self.sizes = array("q", (i[1] for i in entries))
+        self.mtimes = array("q", (i[2] for i in entries))
+        self.total_size = sum(self.sizes) * 1.0e-6
+        size_order = sorted(range(len(entries)), key=lambda i: (self.sizes[i], self.names[i]))
+        mtime_order = sorted(range(len(entries)), key=lambda i: (self.mtimes[i], self.names[i]))
+        self.orders = dict(
+            name=range(len(entries)),
+            size=array("l", size_order),
+            mtime=array("l", mtime_order)
+        )
+        self.keys = dict(
+            name=self.names,
+            size=[(self.sizes[i], self.names[i]) for i in size_order],
+            mtime=[(self.mtimes[i], self.names[i]) for i in mtime_order]
+        )
 
+    def __len__(self):
+        return len(self.names)
 
+    def item(self, i):
+        return dict(
+            name=Path(self.names[i]).name,
+            path=self.names[i],
+            size=self.sizes[i] * 1.0e-6,
+            date=strftime("%d/%m/%Y", localtime(self.mtimes[i]))
+        )
 
+    def matcher(self, q=None, ext=None, min_size=None, max_size=None):
+        tests = []
+        if q:
+            q = q.lower()
+            tests.append(lambda i: q in self.names[i].lower())
+        if ext:
+            suffixes = tuple(f".{e.lower().lstrip('.')}" for e in ext.split(","))
+            tests.append(lambda i: self.names[i].lower().endswith(suffixes))
+        if min_size is not None:
+            tests.append(lambda i: self.sizes[i] >= min_size * 1.0e6)
+        if max_size is not None:
+            tests.append(lambda i: self.sizes[i] <= max_size * 1.0e6)
+        return (lambda i: all(test(i) for test in tests)) if tests else None
 
-
-
-def url_content(ident):
-    return f"{env['GIT-URL']}/circuitalmynds/music_{ident}/blob/main/videos"
-class Pictures:
-    path = home_path.joinpath("Pictures/containers")
-    ids = sorted([i.name for i in path.iterdir() if i.is_dir()])
-    route = "/containers/pictures/"
+    def page(self, sort="name", order="asc", cursor=None, limit=100, **filters):
+        if sort not in sorts or order not in ("asc", "desc"):
+            raise CursorError("sort must be one of name, size, mtime and order asc or desc")
+        keys, positions = self.keys[sort], self.orders[sort]
+        after = decode_cursor(cursor, sort, order) if cursor else None
+        if order == "asc":
+            start = bisect_right(keys, after) if after is not None else 0
+            scan = range(start, len(keys))
+        else:
+            start = bisect_left(keys, after) if after is not None else len(keys)
+            scan = range(start - 1, -1, -1)
+        match = self.matcher(**filters)
+        content, last = [], None
+        for p in scan:
+            i = positions[p]
+            if match is None or match(i):
+                content.append(self.item(i))
+                last = keys[p]
+                if len(content) == limit:
+                    break
+        more = last is not None and len(content) == limit and p != scan[-1]
+        return dict(
+            total=len(self) if match is None else None,
+            total_size=self.total_size,
+            count=len(content),
+            next=encode_cursor(sort, order, last) if more else None,
+            content=content
+        )
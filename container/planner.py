@@ -0,0 +1,89 @@
+limits = dict(container=9.5e2, push=1.05e3, file=95.0)
+
+
+class FirstFit:
+
+    def __init__(self, capacities):
+        self.count = len(capacities)
+        self.size = 1
+        while self.size < max(self.count, 1):
+            self.size *= 2
+        self.tree = [float("-inf")] * (2 * self.size)
+        self.tree[self.size:self.size + self.count] = capacities
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def find(self, size):
+        # Leftmost bin whose remaining capacity still fits size, in O(log n).
+        if self.tree[1] < size:
+            return -1
+        i = 1
+        while i < self.size:
+            i = 2 * i if self.tree[2 * i] >= size else 2 * i + 1
+        return i - self.size
+
+    def capacity(self, index):
+        return self.tree[self.size + index]
+
+    def update(self, index, capacity):
+        i = self.size + index
+        self.tree[i] = capacity
+        while i > 1:
+            i //= 2
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def append(self, capacity):
+        if self.count == self.size:
+            leaves = self.tree[self.size:]
+            self.__init__(leaves + [float("-inf")] * len(leaves))
+            self.count = len(leaves)
+        self.update(self.count, capacity)
+        self.count += 1
+        return self.count - 1
+
+
+def first_fit_decreasing(containers, files, limit=None, new_containers=True, prefix="new-"):
+    limit = limits["container"] if limit is None else limit
+    names = sorted(containers)
+    before = dict(containers)
+    bins = FirstFit([limit - containers[i] for i in names])
+    filled = {i: [] for i in names}
+    plan = dict(moves=[], rejected=[], unplaced=[])
+    for file in sorted(files, key=lambda x: (-x["size"], x["name"])):
+        if file["size"] > limits["file"]:
+            plan["rejected"].append(file)
+            continue
+        index = bins.find(file["size"])
+        if index < 0:
+            if not new_containers or file["size"] > limit:
+                plan["unplaced"].append(file)
+                continue
+            names.append(f"{prefix}{len(names) - len(before) + 1}")
+            filled[names[-1]] = []
+            index = bins.append(limit)
+        target = names[index]
+        bins.update(index, bins.capacity(index) - file["size"])
+        filled[target].append(file["name"])
+        plan["moves"].append(dict(
+            name=file["name"], size=file["size"],
+            source=file.get("path"), target=target
+        ))
+    plan["containers"] = {
+        name: dict(
+            files=filled[name],
+            size_before=before.get(name, 0.0),
+            size_after=limit - bins.capacity(i),
+            ready_to_push=limit - bins.capacity(i) <= limits["push"]
+        )
+        for i, name in enumerate(names) if filled[name] or before.get(name, 0.0) > limits["push"]
+    }
+    plan["new_containers"] = names[len(before):]
+    plan["stats"] = dict(
+        files=len(files),
+        moved=len(plan["moves"]),
+        rejected=len(plan["rejected"]),
+        unplaced=len(plan["unplaced"]),
+        moved_size=sum(i["size"] for i in plan["moves"]),
+        limit=limit
+    )
+    return plan
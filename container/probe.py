@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Thread, Lock
+from pathlib import Path
+from os import stat, cpu_count
+import sqlite3
+schema = """
+CREATE TABLE IF NOT EXISTS probe (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    bitrate REAL,
+    codec TEXT,
+    error TEXT
+)
+"""
+fields = ("duration", "width", "height", "fps", "bitrate", "codec", "error")
+
+
+def probe(path, size=None, mtime=None):
+    # The key is what is on disk now, not what the caller last saw: a file
+    # still being copied gets probed again once its size or mtime moves on.
+    try:
+        st = stat(path)
+        size, mtime = st.st_size, st.st_mtime_ns
+    except OSError:
+        pass
+    result = dict(path=path, size=size, mtime=mtime, **{i: None for i in fields})
+    try:
+        from imageio_ffmpeg import read_frames
+        frames = read_frames(path)
+        try:
+            meta = next(frames)
+        finally:
+            frames.close()
+        duration = meta.get("duration") or None
+        result.update(
+            duration=duration,
+            width=meta.get("size", (None, None))[0],
+            height=meta.get("size", (None, None))[1],
+            fps=meta.get("fps"),
+            bitrate=size * 8 / duration if duration else None,
+            codec=meta.get("codec")
+        )
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"
+    return result
+
+
+class ProbeCache:
+    batch = 16
+
+    def __init__(self, database, workers=None):
+        self.database = Path(str(database))
+        self.workers = workers or max(1, (cpu_count() or 2) // 2)
+        self.queue = dict()
+        self.listeners = []
+        self.thread = None
+        self.lock = Lock()
+        self.ready = False
+
+    def connect(self):
+        if not self.ready:
+            self.database.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.database), timeout=30)
+        if not self.ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(schema)
+            self.ready = True
+        return db
+
+    def lookup(self, files, schedule=True):
+        if not files:
+            return dict()
+        db = self.connect()
+        try:
+            rows = dict()
+            paths = list(files)
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows.update(
+                    (row[0], row) for row in db.execute(
+                        f"SELECT path, size, mtime, {', '.join(fields)} FROM probe "
+                        f"WHERE path IN ({', '.join('?' * len(chunk))})", chunk
+                    )
+                )
+        finally:
+            db.close()
+        found, missing = dict(), dict()
+        for path, (size, mtime) in files.items():
+            row = rows.get(path)
+            if row and row[1] == size and row[2] == mtime:
+                found[path] = dict(zip(fields, row[3:]))
+            else:
+                missing[path] = (size, mtime)
+        if schedule and missing:
+            self.schedule(missing)
+        return found
+
+    def schedule(self, files):
+        with self.lock:
+            self.queue.update(files)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self.run, name="probe", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        # Spawned, not forked: this runs on a thread of a multithreaded worker,
+        # and a fork would copy whatever locks other threads hold.
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn")) as pool:
+            while True:
+                with self.lock:
+                    jobs = list(self.queue.items())[:self.batch * self.workers]
+                    for path, _ in jobs:
+                        self.queue.pop(path)
+                    if not jobs:
+                        self.thread = None
+                        return
+                results = list(pool.map(
+                    probe, *zip(*((path, size, mtime) for path, (size, mtime) in jobs))
+                ))
+                self.store(results)
+                for listener in self.listeners:
+                    listener([i["path"] for i in results])
+
+    def store(self, results):
+        db = self.connect()
+        try:
+            with db:
+                db.executemany(
+                    f"INSERT OR REPLACE INTO probe (path, size, mtime, {', '.join(fields)}) "
+                    f"VALUES ({', '.join('?' * (3 + len(fields)))})",
+                    [tuple(i[k] for k in ("path", "size", "mtime") + fields) for i in results]
+                )
+        finally:
+            db.close()
+
+    def refresh(self, paths):
+        files = dict()
+        for path in map(str, paths):
+            try:
+                st = stat(path)
+            except OSError:
+                continue
+            files[path] = (st.st_size, st.st_mtime_ns)
+        return self.lookup(files)
@@ -0,0 +1,139 @@
+from module.utils import getjson, save_json
+from .links import iter_links
+from requests import Session, RequestException
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from pathlib import Path
+from time import perf_counter
+from os.path import join
+
+
+def parse_links(page_data, base_url, backend=None):
+    return [
+        dict(name=title, url=f"{base_url}{href}?raw=true")
+        for title, href in iter_links(page_data, backend=backend)
+    ]
+
+
+class GitScraper:
+    workers = 8
+    timeout = 30
+    chunk_size = 65536
+    parser = "html.parser"
+
+    def __init__(self, base_url, folder, validators, **opts):
+        self.base_url = base_url
+        self.folder = Path(str(folder))
+        self.validators_path = Path(str(validators))
+        self.workers = opts.get("workers", self.workers)
+        self.timeout = opts.get("timeout", self.timeout)
+        self.parser = opts.get("parser", self.parser)
+        self.validators = None
+        self.session = None
+        self.lock = Lock()
+
+    def page_url(self, ident):
+        return join(self.base_url, f"circuitalmynds/music_{ident}/tree/main/videos")
+
+    def jsonfile(self, ident):
+        return self.folder.joinpath(f"{ident}.json")
+
+    def get_session(self):
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    session = Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.workers, pool_maxsize=self.workers
+                    )
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self.session = session
+        return self.session
+
+    def get_validators(self):
+        if self.validators is None:
+            with self.lock:
+                if self.validators is None:
+                    try:
+                        self.validators = getjson(self.validators_path)
+                    except (OSError, ValueError):
+                        self.validators = dict()
+        return self.validators
+
+    def cached(self, ident):
+        # The last listing on disk; the in-memory copy belongs to JsonCache.
+        try:
+            return getjson(self.jsonfile(ident))
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, ident):
+        start = perf_counter()
+        report = dict(id=ident, status=None, changed=False, count=0, content=[])
+        validators = self.get_validators()
+        known = validators.get(ident, {})
+        stored = self.jsonfile(ident).exists()
+        headers = dict()
+        if stored:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last-modified"):
+                headers["If-Modified-Since"] = known["last-modified"]
+        try:
+            with self.get_session().get(
+                self.page_url(ident), headers=headers, timeout=self.timeout, stream=True
+            ) as response:
+                report["status"] = response.status_code
+                if response.status_code == 200:
+                    content = parse_links(
+                        response.iter_content(self.chunk_size, decode_unicode=True),
+                        self.base_url, self.parser
+                    )
+        except RequestException as error:
+            report["error"] = str(error)
+            response = None
+        if response is not None and response.status_code == 304:
+            report["content"] = self.cached(ident)
+        elif response is not None and response.status_code == 200:
+            report["changed"] = content != (self.cached(ident) if stored else None)
+            report["content"] = content
+            if report["changed"]:
+                save_json(self.jsonfile(ident), content, ensure_ascii=True)
+            with self.lock:
+                validators[ident] = dict(
+                    etag=response.headers.get("ETag"),
+                    **{"last-modified": response.headers.get("Last-Modified")}
+                )
+        elif stored:
+            report["content"] = self.cached(ident) or []
+        report["count"] = len(report["content"] or [])
+        report["time"] = perf_counter() - start
+        return report
+
+    def refresh(self, idents, workers=None, callback=None):
+        start = perf_counter()
+        # Never more threads than the session has pooled connections.
+        workers = max(1, min(workers or self.workers, self.workers, len(idents) or 1))
+
+        def fetch(ident):
+            report = self.fetch(ident)
+            if callback is not None:
+                callback(ident, report)
+            return report
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(fetch, idents))
+        validators = self.get_validators()
+        with self.lock:
+            self.validators_path.parent.mkdir(parents=True, exist_ok=True)
+            save_json(self.validators_path, validators, indent=None)
+        return dict(
+            workers=workers,
+            total_time=perf_counter() - start,
+            results=[
+                {k: v for k, v in report.items() if k != "content"}
+                for report in reports
+            ]
+        )
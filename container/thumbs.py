@@ -0,0 +1,210 @@
+from module.scanner import iter_files
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import Lock
+from hashlib import sha1
+from pathlib import Path
+from os import stat, utime, remove, replace, getpid, cpu_count
+extensions = dict(
+    pictures=(".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"),
+    videos=(".mp4",)
+)
+
+
+def downscale(image, width):
+    import numpy as np
+    image = np.asarray(image)
+    if image.ndim == 3 and image.shape[2] < 3:
+        image = image[..., 0]
+    if image.ndim == 2:
+        image = np.stack([image] * 3, axis=-1)
+    image = image[..., :3]
+    if np.issubdtype(image.dtype, np.integer) and image.dtype != np.uint8:
+        # 16-bit sources would wrap around on the cast to uint8.
+        image = image * (255.0 / np.iinfo(image.dtype).max)
+    factor = -(-max(image.shape[:2]) // width)
+    # Each axis keeps at least one row/column, so thin panoramas still render.
+    fy, fx = min(factor, image.shape[0]), min(factor, image.shape[1])
+    if fy > 1 or fx > 1:
+        h, w = (image.shape[0] // fy) * fy, (image.shape[1] // fx) * fx
+        image = image[:h, :w].reshape(h // fy, fy, w // fx, fx, 3).mean(axis=(1, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def poster_frame(path):
+    import numpy as np
+    from imageio_ffmpeg import read_frames
+    frames = read_frames(path)
+    try:
+        seek = (next(frames).get("duration") or 0.0) * 0.1
+    finally:
+        frames.close()
+    frames = read_frames(path, input_params=["-ss", f"{seek:.2f}"])
+    try:
+        meta = next(frames)
+        frame = next(frames)
+    finally:
+        frames.close()
+    width, height = meta["size"]
+    return np.frombuffer(frame, dtype=np.uint8).reshape(height, width, 3)
+
+
+def render(jobs):
+    import imageio.v2 as imageio
+    results = []
+    for kind, source, target, width in jobs:
+        try:
+            image = poster_frame(source) if kind == "videos" else imageio.imread(source)
+            partial = f"{target}.{getpid()}.part"
+            imageio.imwrite(partial, downscale(image, width), format="JPEG", quality=85)
+            replace(partial, target)
+            results.append((target, None))
+        except Exception as error:
+            results.append((target, f"{type(error).__name__}: {error}"))
+    return results
+
+
+class ThumbCache:
+    width = 256
+    max_bytes = 512 * 1024 ** 2
+    batch = 8
+    timeout = 60
+
+    def __init__(self, folder, **opts):
+        self.folder = Path(str(folder))
+        for key in ("width", "max_bytes", "batch", "timeout"):
+            setattr(self, key, opts.get(key, getattr(self, key)))
+        self.workers = opts.get("workers") or max(1, (cpu_count() or 2) // 2)
+        self.pool = None
+        self.disk = None
+        self.lock = Lock()
+
+    def digest(self, kind, source, width=None):
+        st = stat(source)
+        return sha1(
+            f"{kind}:{source}:{st.st_size}:{st.st_mtime_ns}:{width or self.width}".encode()
+        ).hexdigest()
+
+    def path(self, digest):
+        return self.folder.joinpath(digest[:2], f"{digest}.jpg")
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=get_context("spawn")
+                )
+            return self.pool
+
+    def discard(self, pool):
+        # A worker that died (OOM, a crashing decoder) breaks the whole pool;
+        # the next get_pool() starts a fresh one.
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False)
+
+    def submit(self, jobs):
+        pool = self.get_pool()
+        try:
+            return pool, pool.submit(render, jobs)
+        except BrokenProcessPool:
+            self.discard(pool)
+            pool = self.get_pool()
+            return pool, pool.submit(render, jobs)
+
+    def get(self, kind, source, width=None):
+        width = width or self.width
+        digest = self.digest(kind, source, width)
+        target = self.path(digest)
+        if target.is_file():
+            utime(target)
+            return digest, target
+        target.parent.mkdir(parents=True, exist_ok=True)
+        jobs = [(kind, str(source), str(target), width)]
+        pool, future = self.submit(jobs)
+        try:
+            result = future.result(self.timeout)
+        except BrokenProcessPool:
+            self.discard(pool)
+            result = self.submit(jobs)[1].result(self.timeout)
+        if result[0][1] is not None:
+            raise OSError(result[0][1])
+        self.added(target)
+        return digest, target
+
+    def prefetch(self, kind, sources, width=None):
+        width = width or self.width
+        jobs = []
+        for source in sources:
+            try:
+                target = self.path(self.digest(kind, source, width))
+            except OSError:
+                continue
+            if not target.is_file():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                jobs.append((kind, str(source), str(target), width))
+        for i in range(0, len(jobs), self.batch):
+            pool, future = self.submit(jobs[i:i + self.batch])
+            future.add_done_callback(lambda f, pool=pool: self.rendered(f, pool))
+        return len(jobs)
+
+    def rendered(self, future, pool):
+        if isinstance(future.exception(), BrokenProcessPool):
+            self.discard(pool)
+            return
+        for target, error in future.result():
+            if error is None:
+                self.added(Path(target))
+
+    def sizes(self):
+        if self.disk is None:
+            disk = dict()
+            for sub in iter_files(self.folder, recursive=True):
+                if sub.name.endswith(".jpg"):
+                    st = sub.stat()
+                    disk[sub.path] = (st.st_size, st.st_mtime)
+            with self.lock:
+                if self.disk is None:
+                    self.disk = disk
+        return self.disk
+
+    def added(self, target):
+        disk = self.sizes()
+        try:
+            st = target.stat()
+        except OSError:
+            return
+        with self.lock:
+            disk[str(target)] = (st.st_size, st.st_mtime)
+            total = sum(i[0] for i in disk.values())
+            if total <= self.max_bytes:
+                return
+            # Served files get their mtime bumped, so it doubles as last access.
+            order = sorted(disk, key=lambda i: self.mtime(i, disk[i][1]))
+            evicted = []
+            for path in order:
+                if total <= self.max_bytes:
+                    break
+                total -= disk.pop(path)[0]
+                evicted.append(path)
+        for path in evicted:
+            try:
+                remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def mtime(path, default):
+        try:
+            return stat(path).st_mtime
+        except OSError:
+            return default
+
+    def stats(self):
+        disk = self.sizes()
+        return dict(
+            files=len(disk), bytes=sum(i[0] for i in disk.values()),
+            max_bytes=self.max_bytes, width=self.width
+        )
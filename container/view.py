@@ -1,13 +1,39 @@
-from container import Videos, Pictures
-from flask import redirect, url_for, abort, Blueprint, jsonify
+from container import Videos, Pictures, thumbs
+from container.thumbs import extensions
+from container.pictures import CursorError
+from flask import redirect, url_for, abort, Blueprint, jsonify, request, send_file
+from werkzeug.security import safe_join
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 container = Blueprint("container", __name__)
 container_names = ("videos", "pictures")
+# Upper bound on the containers one refresh request scrapes upstream.
+max_refresh = 50
 
 
 def json_response(data):
     return jsonify(data)
 
 
+def thumb_response(kind, root, name):
+    source = safe_join(str(root), name)
+    if source is None or not source.lower().endswith(extensions[kind]):
+        abort(404)
+    if not Path(source).is_file():
+        abort(404)
+    width = min(max(request.args.get("width", thumbs.width, type=int), 16), 1024)
+    try:
+        digest, target = thumbs.get(kind, source, width)
+    except (OSError, TimeoutError):
+        abort(415)
+    except BrokenProcessPool:
+        abort(503)
+    return send_file(
+        str(target), mimetype="image/jpeg", conditional=True, etag=digest, max_age=86400
+    )
+
+
 @container.route("/container/")
 @container.route("/container/<name>/")
 def container_root(name=None):
@@ -27,7 +53,39 @@ def videos_view(folder=None):
         else:
             abort(404)
     else:
-        return jsonify(folders=videos.ids)
+        return jsonify(videos.ids.snapshot())
+
+
+@container.route("/container/videos/refresh/", methods=["POST"])
+def videos_refresh():
+    ids = request.args.get("ids")
+    ids = [i for i in ids.split(",") if i in Videos.ids] if ids else list(Videos.ids)
+    limit = min(max(request.args.get("limit", max_refresh, type=int), 1), max_refresh)
+    return jsonify(Videos.scraper.refresh(
+        ids[:limit],
+        request.args.get("workers", type=int),
+        Videos.cache.store
+    ))
+
+
+@container.route("/container/videos/cache/")
+def videos_cache():
+    return jsonify(Videos.cache.stats())
+
+
+@container.route("/container/videos/plan/")
+def videos_plan():
+    return jsonify(Videos().push_plan(
+        request.args.get("limit", type=float),
+        request.args.get("new", "1") not in ("0", "false")
+    ))
+
+
+@container.route("/container/videos/<folder>/poster/<name>")
+def videos_poster(folder, name):
+    if folder not in Videos.ids:
+        abort(404)
+    return thumb_response("videos", Videos.path.joinpath(folder, "videos"), name)
 
 
 @container.route("/container/pictures/")
@@ -35,31 +93,34 @@ def videos_view(folder=None):
 def pictures_view(folder=None):
     if folder:
         if folder in Pictures.ids:
-            return jsonify(name=folder, content=[])
+            args = request.args
+            try:
+                page = Pictures.get_folder(folder).page(
+                    args.get("sort", "name"), args.get("order", "asc"), args.get("cursor"),
+                    min(max(args.get("limit", 100, type=int), 1), 1000),
+                    q=args.get("q"), ext=args.get("ext"),
+                    min_size=args.get("min_size", type=float),
+                    max_size=args.get("max_size", type=float)
+                )
+            except CursorError as error:
+                abort(400, str(error))
+            for item in page["content"]:
+                item["thumb"] = url_for(
+                    "container.pictures_thumb", folder=folder, name=item["path"]
+                )
+            if args.get("thumbs") == "1":
+                thumbs.prefetch("pictures", (
+                    Pictures.path.joinpath(folder, i["path"]) for i in page["content"]
+                ))
+            return jsonify(name=folder, **page)
         else:
             abort(404)
     else:
-        return jsonify(folders=Pictures.ids)
-
+        return jsonify(Pictures.ids.snapshot())
 
-'''
 
-def videos_update_all():
-    gitdata = {}
-    files = {}
-    for i in cls.ids:
-        gitdata[i] = cls.git_content(i)
-        files[i] = cls.get_folder(i)
-    save_json(
-        folder_data.joinpath("videos-git-content.json"),
-        gitdata,
-        ensure_ascii=True
-    )
-    save_json(
-        folder_data.joinpath("videos-files.json"),
-        files,
-        ensure_ascii=True
-    )
-    return jsonify(dict(files=files, **{"git-content": gitdata}))
-
-'''
+@container.route("/container/pictures/<folder>/thumb/<path:name>")
+def pictures_thumb(folder, name):
+    if folder not in Pictures.ids:
+        abort(404)
+    return thumb_response("pictures", Pictures.path.joinpath(folder), name)
@@ -0,0 +1,197 @@
+from hashlib import sha256
+from pathlib import Path
+from uuid import uuid4
+from time import time
+from os import link, replace, fsync, stat
+import sqlite3
+schema = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hash TEXT,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS links_hash ON links (hash);
+"""
+block_size = 1024 * 1024
+
+
+def hash_file(path):
+    digest = sha256()
+    with open(str(path), "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BlobStore:
+
+    def __init__(self, root, database):
+        self.root = Path(str(root))
+        self.database = Path(str(database))
+        self.ready = False
+
+    def connect(self):
+        db = sqlite3.connect(str(self.database), timeout=30)
+        if not self.ready:
+            db.executescript(schema)
+            self.ready = True
+        return db
+
+    def partial(self):
+        folder = self.root.joinpath("tmp")
+        folder.mkdir(parents=True, exist_ok=True)
+        return folder.joinpath(uuid4().hex)
+
+    def blob(self, digest):
+        return self.root.joinpath(digest[:2], digest)
+
+    def ingest(self, stream):
+        partial = self.partial()
+        digest, size = sha256(), 0
+        with partial.open("wb") as file:
+            for block in iter(lambda: stream.read(block_size), b""):
+                file.write(block)
+                digest.update(block)
+                size += len(block)
+            file.flush()
+            fsync(file.fileno())
+        return self.store(partial, digest.hexdigest()), size
+
+    def store(self, path, digest):
+        blob = self.blob(digest)
+        if blob.exists():
+            Path(str(path)).unlink()
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            replace(str(path), blob)
+        return digest
+
+    def save(self, stream, folder, path, name):
+        digest, size = self.ingest(stream)
+        link(self.blob(digest), Path(str(path)).joinpath(name))
+        self.add_link(folder, name, digest, size)
+        return digest
+
+    def adopt(self, folder, path, name, digest=None):
+        # Bring a plain file under the store; if the content is already known
+        # the file is swapped for a link to the existing blob.
+        target = Path(str(path)).joinpath(name)
+        digest = digest or hash_file(target)
+        blob = self.blob(digest)
+        if blob.exists():
+            partial = self.partial()
+            link(blob, partial)
+            replace(partial, target)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            link(target, blob)
+        self.add_link(folder, name, digest, stat(target).st_size)
+        return digest
+
+    def add_link(self, folder, name, digest, size, created=None):
+        db = self.connect()
+        try:
+            with db:
+                self.drop_link(db, folder, name)
+                db.execute(
+                    "INSERT INTO links (folder, name, hash, size, created) VALUES (?, ?, ?, ?, ?)",
+                    (folder, name, digest, size, created or time())
+                )
+                if digest:
+                    db.execute(
+                        "INSERT INTO blobs (hash, size, refs) VALUES (?, ?, 1) "
+                        "ON CONFLICT (hash) DO UPDATE SET refs = refs + 1", (digest, size)
+                    )
+        finally:
+            db.close()
+
+    def drop_link(self, db, folder, name):
+        row = db.execute(
+            "SELECT hash FROM links WHERE folder = ? AND name = ?", (folder, name)
+        ).fetchone()
+        if row is None:
+            return
+        db.execute("DELETE FROM links WHERE folder = ? AND name = ?", (folder, name))
+        if row[0]:
+            db.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (row[0],))
+            orphan = db.execute(
+                "SELECT hash FROM blobs WHERE hash = ? AND refs <= 0", (row[0],)
+            ).fetchone()
+            if orphan:
+                db.execute("DELETE FROM blobs WHERE hash = ?", (row[0],))
+                self.blob(row[0]).unlink(missing_ok=True)
+
+    def move(self, folder, path, name, target, target_path, target_name):
+        destination = Path(str(target_path)).joinpath(target_name)
+        replace(Path(str(path)).joinpath(name), destination)
+        db = self.connect()
+        try:
+            with db:
+                self.drop_link(db, target, target_name)
+                moved = db.execute(
+                    "UPDATE links SET folder = ?, name = ?, created = ? WHERE folder = ? AND name = ?",
+                    (target, target_name, time(), folder, name)
+                ).rowcount
+                if not moved:
+                    db.execute(
+                        "INSERT INTO links (folder, name, hash, size, created) VALUES (?, ?, NULL, ?, ?)",
+                        (target, target_name, stat(destination).st_size, time())
+                    )
+        finally:
+            db.close()
+
+    def remove(self, folder, path, name):
+        self.remove_many(folder, path, [name])
+
+    def remove_many(self, folder, path, names):
+        for name in names:
+            Path(str(path)).joinpath(name).unlink(missing_ok=True)
+        db = self.connect()
+        try:
+            with db:
+                for name in names:
+                    self.drop_link(db, folder, name)
+        finally:
+            db.close()
+
+    def links(self, folder):
+        db = self.connect()
+        try:
+            return {
+                name: dict(hash=digest, size=size, created=created)
+                for name, digest, size, created in db.execute(
+                    "SELECT name, hash, size, created FROM links WHERE folder = ?", (folder,)
+                )
+            }
+        finally:
+            db.close()
+
+    def stats(self):
+        db = self.connect()
+        try:
+            logical, names = db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM links WHERE hash IS NOT NULL"
+            ).fetchone()
+            physical, blobs = db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM blobs"
+            ).fetchone()
+            untracked = db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM links WHERE hash IS NULL"
+            ).fetchone()
+        finally:
+            db.close()
+        return dict(
+            names=names, blobs=blobs,
+            logical_size=logical * 1.0e-6, physical_size=physical * 1.0e-6,
+            saved_size=(logical - physical) * 1.0e-6,
+            dedup_ratio=logical / physical if physical else 1.0,
+            untracked=dict(names=untracked[1], size=untracked[0] * 1.0e-6)
+        )
@@ -1,62 +1,85 @@
-from libs.utils import base_path, iter_folder
-from .view import documents, videos, pictures, trash
-from flask import send_file
+from .view import documents, videos, pictures, trash, upload, stats, compactor
+from .upload import UploadStore
+from .stream import send_range
+from .index import DriveIndex
+from .blobs import BlobStore
+from .compactor import Compactor
+from module.metrics import timed
 from werkzeug.utils import secure_filename
-from json import dumps
 from pathlib import Path
-
-
-def getinfo(fpath):
-    class Info:
-        path = Path(str(fpath)).joinpath("info.json")
-        total_size = 0.0
-        content = dict()
-        keys = ("total_size", "content")
-        config = dict(indent=4, sort_keys=True, ensure_ascii=False)
-
-        def __init__(self):
-            self.data = dict()
-
-        def update(self):
-            self.data = {key: getattr(self, key) for key in self.keys}
-            self.path.open("w").write(dumps(self.data, **self.config))
-    return Info()
+from time import time
+from os import environ
+drive_root = Path(environ.get("DRIVE-ROOT") or Path(__file__).parent)
+index = DriveIndex(drive_root.joinpath(".index.sqlite3"))
+blobs = BlobStore(drive_root.joinpath(".blobs"), drive_root.joinpath(".index.sqlite3"))
 
 
 class Folder:
 
     def __init__(self, rpath):
-        self.path = Path(base_path).joinpath(f"application/drive/{rpath}")
+        self.rpath = rpath
+        self.path = drive_root.joinpath(rpath)
         self.name = self.path.name
-        self.info = getinfo(self.path)
-        self.getdata()
+        self.index = index
+        self.blobs = blobs
+        self.index.load(self.rpath, self.path)
 
+    @timed("drive.getdata")
     def getdata(self):
-        self.reset_data()
-        self.info.content.update(iter_folder(self.path))
-        self.info.update()
-        return self.info.data
-
-    def reset_data(self):
-        self.info = getinfo(self.path)
+        return self.index.data(self.rpath)
 
     def save_file(self, data):
         for file in data:
-            filepath = self.path.joinpath(secure_filename(file.filename))
+            filename = secure_filename(file.filename)
+            filepath = self.path.joinpath(filename)
             if not filepath.is_file():
-                file.save(str(filepath))
+                self.blobs.save(file.stream, self.rpath, self.path, filename)
+                self.index.put(self.rpath, filename)
+
+    def add_file(self, filename, digest=None):
+        self.blobs.adopt(self.rpath, self.path, filename, digest)
+        self.index.put(self.rpath, filename)
+
+    def delete_file(self, filename):
+        filename = secure_filename(filename)
+        if not self.path.joinpath(filename).is_file():
+            return False
+        if self.rpath == "trash":
+            self.blobs.remove(self.rpath, self.path, filename)
+        else:
+            trash_path = drive_root.joinpath("trash")
+            name = filename
+            if trash_path.joinpath(name).exists():
+                stem, suffix = Path(filename).stem, Path(filename).suffix
+                name = f"{stem}.{int(time() * 1000)}{suffix}"
+            self.blobs.move(self.rpath, self.path, filename, "trash", trash_path, name)
+            self.index.put("trash", name)
+        self.index.remove(self.rpath, filename)
+        return True
 
     def getfile(self, filepath):
         file = self.path.joinpath(filepath)
-        return send_file(
-            str(file), download_name=file.name
-        )
+        return send_range(file, download_name=file.name, internal=f"{self.rpath}/{filepath}")
 
 
 def init_drive(app):
     trash(app, Folder("trash"))
+    uploads = UploadStore(drive_root.joinpath(".uploads"))
+    folders = []
     for view in (documents, videos, pictures):
-        view(app, Folder(f"storage/{view.__name__}"))
+        folder = Folder(f"storage/{view.__name__}")
+        view(app, folder)
+        upload(app, folder, uploads)
+        folders.append(folder.rpath)
+    stats(app, blobs)
+    scheduler = Compactor(
+        index, blobs, "trash", folders, drive_root,
+        quotas=app.config.get("DRIVE_QUOTAS"),
+        interval=app.config.get("DRIVE_COMPACT_INTERVAL", Compactor.interval),
+        max_age=app.config.get("DRIVE_TRASH_MAX_AGE", Compactor.max_age)
+    )
+    compactor(app, scheduler)
+    scheduler.start()
 
 
 
@@ -0,0 +1,179 @@
+from threading import Thread, Event, Lock
+from pathlib import Path
+from time import time, sleep
+from json import dumps, load
+from os import getpid, replace, stat, open as os_open, close, O_RDWR, O_CREAT
+from fcntl import flock, LOCK_EX, LOCK_NB
+
+
+class Compactor:
+    interval = 300.0
+    max_age = 30 * 24 * 3600.0
+    batch = 64
+    pause = 0.05
+
+    def __init__(self, index, blobs, trash, folders, root, quotas=None, **options):
+        self.index = index
+        self.blobs = blobs
+        self.trash = trash
+        self.folders = folders
+        self.quotas = {k: int(v * 1.0e6) for k, v in (quotas or {}).items()}
+        for key, value in options.items():
+            setattr(self, key, value)
+        self.root = Path(str(root))
+        self.lock_path = self.root.joinpath(".compactor.lock")
+        self.stats_path = self.root.joinpath(".compactor.json")
+        self.leader = None
+        self.stop_event = Event()
+        self.run_lock = Lock()
+        self.thread = None
+        self.pid = None
+        self.last = dict()
+
+    def elect(self):
+        # Whoever holds the flock is the leader until its process exits.
+        if self.leader is not None:
+            return True
+        fd = os_open(str(self.lock_path), O_RDWR | O_CREAT)
+        try:
+            flock(fd, LOCK_EX | LOCK_NB)
+        except BlockingIOError:
+            close(fd)
+            return False
+        self.leader = fd
+        return True
+
+    def start(self):
+        if self.pid == getpid() and self.thread is not None and self.thread.is_alive():
+            return
+        # A forked worker inherits the parent's fd but not its thread.
+        self.leader, self.pid = None, getpid()
+        self.stop_event.clear()
+        self.thread = Thread(target=self.loop, name="drive-compactor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.leader is not None:
+            close(self.leader)
+            self.leader = None
+
+    def loop(self):
+        while not self.stop_event.wait(self.interval):
+            if self.elect():
+                self.run()
+
+    def files(self, folder):
+        with self.index.lock:
+            return dict(self.index.folders[folder]["files"])
+
+    def created(self, names):
+        links = self.blobs.links(self.trash)
+        path = self.index.paths[self.trash]
+        for name in names:
+            if name in links:
+                yield name, links[name]["created"]
+            else:
+                try:
+                    # rename updates ctime, so it is when the file was trashed.
+                    yield name, stat(path.joinpath(name)).st_ctime
+                except OSError:
+                    continue
+
+    def purge(self, names, report):
+        path, files = self.index.paths[self.trash], self.files(self.trash)
+        for i in range(0, len(names), self.batch):
+            chunk = names[i:i + self.batch]
+            report["purged_size"] += sum(files.get(name, (0,))[0] for name in chunk)
+            self.blobs.remove_many(self.trash, path, chunk)
+            self.index.apply(self.trash, {}, chunk)
+            report["purged"] += len(chunk)
+            sleep(self.pause)
+
+    def evict(self, folder, excess, report):
+        path, files = self.index.paths[folder], self.files(folder)
+        trash_path = self.index.paths[self.trash]
+        names, freed = [], 0
+        for name, data in sorted(files.items(), key=lambda item: item[1][1]):
+            if freed >= excess:
+                break
+            names.append(name)
+            freed += data[0]
+        for i in range(0, len(names), self.batch):
+            moved = []
+            for name in names[i:i + self.batch]:
+                target = name
+                if trash_path.joinpath(target).exists():
+                    target = f"{Path(name).stem}.{int(time() * 1000)}{Path(name).suffix}"
+                try:
+                    self.blobs.move(folder, path, name, self.trash, trash_path, target)
+                except OSError:
+                    report["errors"] += 1
+                    continue
+                moved.append((name, target))
+            self.index.apply(folder, {}, [name for name, _ in moved])
+            for _, target in moved:
+                self.index.put(self.trash, target)
+            report["moved"] += len(moved)
+            sleep(self.pause)
+
+    def run(self):
+        if not self.run_lock.acquire(blocking=False):
+            return self.last
+        try:
+            started = time()
+            report = dict(
+                pid=getpid(), started=started, moved=0, purged=0, purged_size=0, errors=0
+            )
+            for folder in self.folders:
+                quota = self.quotas.get(folder)
+                excess = self.index.folders[folder]["total"] - quota if quota else 0
+                if excess > 0:
+                    self.evict(folder, excess, report)
+            files = self.files(self.trash)
+            created = dict(self.created(files))
+            expired = [name for name, t in created.items() if started - t > self.max_age]
+            self.purge(expired, report)
+            for name in expired:
+                created.pop(name)
+            quota = self.quotas.get(self.trash)
+            excess = self.index.folders[self.trash]["total"] - quota if quota else 0
+            if excess > 0:
+                oldest, freed = [], 0
+                for name in sorted(created, key=created.get):
+                    if freed >= excess:
+                        break
+                    if name in files:
+                        oldest.append(name)
+                        freed += files[name][0]
+                self.purge(oldest, report)
+            report["purged_size"] *= 1.0e-6
+            report["time"] = time() - started
+            report["folders"] = {
+                folder: dict(
+                    size=self.index.total_size(folder),
+                    quota=self.quotas[folder] * 1.0e-6 if folder in self.quotas else None
+                ) for folder in (*self.folders, self.trash)
+            }
+            self.last = report
+            self.save(report)
+            return report
+        finally:
+            self.run_lock.release()
+
+    def save(self, report):
+        partial = self.stats_path.with_suffix(".tmp")
+        partial.write_text(dumps(report))
+        replace(partial, self.stats_path)
+
+    def stats(self):
+        try:
+            last = load(self.stats_path.open())
+        except (OSError, ValueError):
+            last = self.last or None
+        return dict(
+            pid=getpid(), leader=self.leader is not None,
+            interval=self.interval, max_age=self.max_age, batch=self.batch,
+            quotas={k: v * 1.0e-6 for k, v in self.quotas.items()},
+            last=last
+        )
@@ -0,0 +1,146 @@
+from module.watcher import Watcher
+from threading import Lock
+from pathlib import Path
+from os import scandir, stat
+import sqlite3
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    PRIMARY KEY (folder, name)
+)
+"""
+ignored = ("info.json",)
+
+
+def file_etag(inode, size, mtime):
+    return f"{inode:x}-{size:x}-{mtime:x}"
+
+
+class DriveIndex:
+
+    def __init__(self, database):
+        self.database = Path(str(database))
+        self.folders = dict()
+        self.paths = dict()
+        self.views = dict()
+        self.watcher = None
+        self.lock = Lock()
+        self.ready = False
+
+    def connect(self):
+        db = sqlite3.connect(str(self.database), timeout=30)
+        if not self.ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(schema)
+            self.ready = True
+        return db
+
+    def load(self, folder, path):
+        self.paths[folder] = Path(str(path))
+        db = self.connect()
+        try:
+            rows = db.execute(
+                "SELECT name, size, mtime, inode FROM files WHERE folder = ?", (folder,)
+            ).fetchall()
+        finally:
+            db.close()
+        with self.lock:
+            self.folders[folder] = dict(
+                files={name: (size, mtime, inode) for name, size, mtime, inode in rows},
+                total=sum(row[1] for row in rows)
+            )
+            self.views.pop(folder, None)
+        self.sync(folder)
+        self.watch(folder)
+
+    def watch(self, folder):
+        if self.watcher is None:
+            self.watcher = Watcher(self.changed)
+        if not self.watcher.running():
+            self.watcher.start()
+            self.watcher.watch(*self.paths.values())
+        else:
+            self.watcher.watch(self.paths[folder])
+
+    def changed(self, paths):
+        for folder, path in list(self.paths.items()):
+            if str(path) in paths:
+                self.sync(folder)
+
+    @staticmethod
+    def scan(path):
+        files = dict()
+        try:
+            with scandir(str(path)) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name in ignored:
+                        continue
+                    if entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except FileNotFoundError:
+            pass
+        return files
+
+    def sync(self, folder):
+        files = self.scan(self.paths[folder])
+        with self.lock:
+            known = self.folders[folder]["files"]
+            changed = {k: v for k, v in files.items() if known.get(k) != v}
+            removed = [k for k in known if k not in files]
+        if changed or removed:
+            self.apply(folder, changed, removed)
+
+    def put(self, folder, name):
+        try:
+            st = stat(self.paths[folder].joinpath(name))
+        except OSError:
+            return self.remove(folder, name)
+        self.apply(folder, {name: (st.st_size, st.st_mtime_ns, st.st_ino)}, [])
+
+    def remove(self, folder, name):
+        self.apply(folder, {}, [name])
+
+    def apply(self, folder, changed, removed):
+        db = self.connect()
+        try:
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO files (folder, name, size, mtime, inode) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(folder, name, *data) for name, data in changed.items()]
+                )
+                db.executemany(
+                    "DELETE FROM files WHERE folder = ? AND name = ?",
+                    [(folder, name) for name in removed]
+                )
+        finally:
+            db.close()
+        with self.lock:
+            entry = self.folders[folder]
+            for name, data in changed.items():
+                entry["total"] += data[0] - entry["files"].get(name, (0,))[0]
+                entry["files"][name] = data
+            for name in removed:
+                entry["total"] -= entry["files"].pop(name, (0,))[0]
+            self.views.pop(folder, None)
+
+    def total_size(self, folder):
+        return self.folders[folder]["total"] * 1.0e-6
+
+    def data(self, folder):
+        view = self.views.get(folder)
+        if view is None:
+            with self.lock:
+                entry = self.folders[folder]
+                view = self.views[folder] = dict(
+                    total_size=entry["total"] * 1.0e-6,
+                    content={
+                        f"/drive/{folder}": dict(dirs=[], files=sorted(entry["files"]))
+                    }
+                )
+        return view
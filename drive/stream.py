@@ -0,0 +1,95 @@
+from .index import file_etag
+from flask import request, current_app, Response, abort
+from werkzeug.http import parse_range_header, http_date, quote_etag, unquote_etag
+from werkzeug.wsgi import wrap_file
+from mimetypes import guess_type
+from urllib.parse import quote
+from mmap import mmap, ACCESS_READ
+from os import stat
+from stat import S_ISREG
+chunk_size = 256 * 1024
+
+
+def stat_etag(st):
+    return file_etag(st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def iter_mmap(path, start, length):
+    with open(path, "rb") as file:
+        if length <= 0:
+            return
+        with mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+            end = start + length
+            for offset in range(start, end, chunk_size):
+                yield data[offset:min(offset + chunk_size, end)]
+
+
+def range_allowed(etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        value, weak = unquote_etag(if_range)
+        return not weak and value == etag
+    return if_range == http_date(last_modified)
+
+
+def send_range(path, download_name=None, internal=None):
+    try:
+        st = stat(str(path))
+    except OSError:
+        abort(404)
+    if not S_ISREG(st.st_mode):
+        abort(404)
+    # Validators come from this stat, never from a cached listing that can
+    # lag behind the file being served.
+    etag = stat_etag(st)
+    size, last_modified = st.st_size, int(st.st_mtime)
+    mimetype = guess_type(str(path))[0] or "application/octet-stream"
+    headers = {
+        "ETag": quote_etag(etag),
+        "Last-Modified": http_date(last_modified),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache"
+    }
+    if download_name:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    if request.if_none_match.contains_weak(etag) or (
+        not request.if_none_match and request.if_modified_since
+        and last_modified <= request.if_modified_since.timestamp()
+    ):
+        return Response(status=304, headers=headers)
+    offload = current_app.config.get("DRIVE_SENDFILE")
+    if offload and internal:
+        # The front server does the transfer, including Range handling.
+        if offload == "x-accel-redirect":
+            prefix = current_app.config.get("DRIVE_ACCEL_PREFIX", "/drive-internal/")
+            headers["X-Accel-Redirect"] = quote(f"{prefix.rstrip('/')}/{internal}")
+        else:
+            headers["X-Sendfile"] = str(path)
+        return Response(status=200, headers=headers, mimetype=mimetype)
+    start, length, status = 0, size, 200
+    ranges = parse_range_header(request.headers.get("Range"))
+    if ranges is not None and range_allowed(etag, last_modified):
+        bounds = ranges.range_for_length(size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, length, status = bounds[0], bounds[1] - bounds[0], 206
+        headers["Content-Range"] = f"bytes {bounds[0]}-{bounds[1] - 1}/{size}"
+    headers["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        body = []
+    elif request.environ.get("wsgi.file_wrapper") and request.environ.get(
+        "SERVER_SOFTWARE", ""
+    ).startswith("gunicorn"):
+        # gunicorn's file wrapper uses os.sendfile from the current offset
+        # for Content-Length bytes, so ranges stay zero-copy too.
+        file = open(str(path), "rb")
+        file.seek(start)
+        body = wrap_file(request.environ, file, chunk_size)
+    else:
+        body = iter_mmap(str(path), start, length)
+    return Response(
+        body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True
+    )
@@ -0,0 +1,157 @@
+from werkzeug.utils import secure_filename
+from hashlib import sha256
+from pathlib import Path
+from shutil import rmtree
+from uuid import uuid4
+from time import time
+from json import dumps, load
+from os import fsync, replace, open as os_open, close, O_RDONLY, O_RDWR, O_CREAT
+from fcntl import flock, LOCK_EX, LOCK_NB, LOCK_UN
+block_size = 1024 * 1024
+
+
+class UploadError(Exception):
+    code = 400
+
+    def __init__(self, message, code=None, **data):
+        super().__init__(message)
+        self.code = code or self.code
+        self.data = dict(message=message, **data)
+
+
+def fsync_dir(path):
+    fd = os_open(str(path), O_RDONLY)
+    try:
+        fsync(fd)
+    finally:
+        close(fd)
+
+
+class UploadStore:
+    max_age = 7 * 24 * 3600.0
+    max_chunk = 64 * 1024 ** 2
+
+    def __init__(self, root):
+        self.root = Path(str(root))
+
+    def folder(self, upload_id):
+        if not upload_id.isalnum():
+            raise UploadError("unknown upload", 404)
+        path = self.root.joinpath(upload_id)
+        if not path.joinpath("meta.json").is_file():
+            raise UploadError("unknown upload", 404)
+        return path
+
+    def meta(self, upload_id):
+        path = self.folder(upload_id)
+        meta = load(path.joinpath("meta.json").open())
+        # The part file is the source of truth after a crash or disconnect.
+        meta["received"] = path.joinpath("data.part").stat().st_size
+        return meta
+
+    def save_meta(self, upload_id, meta):
+        path = self.root.joinpath(upload_id, "meta.json")
+        partial = path.with_suffix(".tmp")
+        with partial.open("w") as file:
+            file.write(dumps(meta))
+            file.flush()
+            fsync(file.fileno())
+        replace(partial, path)
+
+    def init(self, target, filename, size, checksum=None):
+        filename = secure_filename(filename or "")
+        if not filename:
+            raise UploadError("filename is required")
+        if size is None or size < 0:
+            raise UploadError("size is required")
+        self.expire()
+        upload_id = uuid4().hex
+        path = self.root.joinpath(upload_id)
+        path.mkdir(parents=True)
+        path.joinpath("data.part").touch()
+        meta = dict(
+            id=upload_id, target=str(target), filename=filename, size=size,
+            checksum=checksum, created=time(), chunks=0
+        )
+        self.save_meta(upload_id, meta)
+        meta["received"] = 0
+        return meta
+
+    def put(self, upload_id, offset, stream, length=None, checksum=None):
+        meta = self.meta(upload_id)
+        if length is not None and length > self.max_chunk:
+            raise UploadError("chunk too large", 413, max_chunk=self.max_chunk)
+        part = self.root.joinpath(upload_id, "data.part")
+        fd = os_open(str(part), O_RDWR | O_CREAT)
+        try:
+            try:
+                flock(fd, LOCK_EX | LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("another chunk is being written", 409, received=meta["received"])
+            with open(fd, "r+b", closefd=False) as file:
+                received = file.seek(0, 2)
+                if offset != received:
+                    raise UploadError("offset mismatch", 409, received=received)
+                digest, written = sha256(), 0
+                while True:
+                    block = stream.read(block_size)
+                    if not block:
+                        break
+                    if written + len(block) > self.max_chunk or received + written + len(block) > meta["size"]:
+                        file.truncate(received)
+                        raise UploadError("chunk exceeds declared size", 413, received=received)
+                    file.write(block)
+                    digest.update(block)
+                    written += len(block)
+                if length is not None and written != length:
+                    file.truncate(received)
+                    raise UploadError("incomplete chunk", 400, received=received)
+                if checksum and checksum.lower() != digest.hexdigest():
+                    file.truncate(received)
+                    raise UploadError("checksum mismatch", 422, received=received)
+                file.flush()
+                fsync(file.fileno())
+            flock(fd, LOCK_UN)
+        finally:
+            close(fd)
+        meta["chunks"] += 1
+        meta["received"] = received + written
+        self.save_meta(upload_id, {k: v for k, v in meta.items() if k != "received"})
+        return meta
+
+    def commit(self, upload_id, checksum=None, folder=None):
+        meta = self.meta(upload_id)
+        if folder is not None and Path(meta["target"]) != Path(str(folder)):
+            raise UploadError("upload belongs to another folder", 409)
+        if meta["received"] != meta["size"]:
+            raise UploadError("upload is incomplete", 409, received=meta["received"])
+        part = self.root.joinpath(upload_id, "data.part")
+        checksum = checksum or meta.get("checksum")
+        digest = sha256()
+        with part.open("rb") as file:
+            for block in iter(lambda: file.read(block_size), b""):
+                digest.update(block)
+        if checksum and checksum.lower() != digest.hexdigest():
+            raise UploadError("checksum mismatch", 422)
+        target = Path(meta["target"]).joinpath(meta["filename"])
+        if target.exists():
+            raise UploadError("file already exists", 409)
+        replace(part, target)
+        fsync_dir(target.parent)
+        rmtree(self.root.joinpath(upload_id), ignore_errors=True)
+        meta["path"], meta["sha256"] = str(target), digest.hexdigest()
+        return meta
+
+    def abort(self, upload_id):
+        rmtree(self.folder(upload_id), ignore_errors=True)
+
+    def expire(self):
+        if not self.root.is_dir():
+            return
+        now = time()
+        for path in self.root.iterdir():
+            try:
+                if now - path.joinpath("meta.json").stat().st_mtime > self.max_age:
+                    rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
@@ -1,20 +1,25 @@
-from flask import request
+from flask import request, jsonify, abort
+from .upload import UploadError
 
 
 def response(app, folder, filename):
     if request.method == "POST":
         folder.save_file(request.files.getlist('files[]'))
-        return app.getjson(folder.getdata())
+        return jsonify(folder.getdata())
+    elif request.method == "DELETE" and filename:
+        if not folder.delete_file(filename):
+            abort(404)
+        return jsonify(folder.getdata())
     elif filename:
         return folder.getfile(filename)
     else:
-        return app.getjson(folder.getdata())
+        return jsonify(folder.getdata())
 
 
 def documents(app, folder):
     @app.route("/drive/", methods=["GET", "POST"])
     @app.route("/drive/documents/", methods=["GET", "POST"])
-    @app.route("/drive/documents/<filename>/", methods=["GET", "POST"])
+    @app.route("/drive/documents/<filename>/", methods=["GET", "POST", "DELETE"])
     def get_documents(filename=None):
         return response(app, folder, filename)
 
@@ -22,7 +27,7 @@ def documents(app, folder):
 def videos(app, folder):
     @app.route("/drive/", methods=["GET", "POST"])
     @app.route("/drive/videos/", methods=["GET", "POST"])
-    @app.route("/drive/videos/<filename>/", methods=["GET", "POST"])
+    @app.route("/drive/videos/<filename>/", methods=["GET", "POST", "DELETE"])
     def get_videos(filename=None):
         return response(app, folder, filename)
 
@@ -30,7 +35,7 @@ def videos(app, folder):
 def pictures(app, folder):
     @app.route("/drive/", methods=["GET", "POST"])
     @app.route("/drive/pictures/", methods=["GET", "POST"])
-    @app.route("/drive/pictures/<filename>/", methods=["GET", "POST"])
+    @app.route("/drive/pictures/<filename>/", methods=["GET", "POST", "DELETE"])
     def get_pictures(filename=None):
         return response(app, folder, filename)
 
@@ -38,5 +43,70 @@ def pictures(app, folder):
 def trash(app, folder):
     @app.route("/drive/", methods=["GET", "POST"])
     @app.route("/drive/trash/", methods=["GET", "POST"])
-    def get_trash():
-        return app.getjson(folder.getdata())
+    @app.route("/drive/trash/<filename>/", methods=["GET", "DELETE"])
+    def get_trash(filename=None):
+        if request.method == "POST":
+            return jsonify(folder.getdata())
+        return response(app, folder, filename)
+
+
+def stats(app, store):
+    @app.route("/drive/stats/")
+    def get_stats():
+        return jsonify(store.stats())
+
+
+def compactor(app, scheduler):
+    @app.route("/drive/trash/compact/", methods=["GET", "POST"])
+    def compact_trash():
+        if request.method == "POST":
+            if not scheduler.elect():
+                return jsonify(message="another worker is the compaction leader"), 409
+            return jsonify(scheduler.run())
+        return jsonify(scheduler.stats())
+
+
+def upload(app, folder, store):
+    name = folder.name
+    root = f"/drive/{name}/upload/"
+
+    def upload_response(action):
+        try:
+            return jsonify({
+                k: v for k, v in action().items() if k not in ("target", "path")
+            })
+        except UploadError as error:
+            response = jsonify(error.data)
+            response.status_code = error.code
+            return response
+
+    @app.route(root, methods=["POST"], endpoint=f"{name}_upload_init")
+    def upload_init():
+        data = request.get_json(silent=True) or request.args
+        return upload_response(lambda: store.init(
+            folder.path, data.get("filename"),
+            int(data["size"]) if str(data.get("size", "")).isdigit() else None,
+            data.get("checksum")
+        ))
+
+    @app.route(f"{root}<upload_id>/", methods=["GET", "PUT", "DELETE"], endpoint=f"{name}_upload_chunk")
+    def upload_chunk(upload_id):
+        if request.method == "PUT":
+            checksum = request.headers.get("X-Chunk-Checksum", "")
+            return upload_response(lambda: store.put(
+                upload_id, request.args.get("offset", -1, type=int), request.stream,
+                request.content_length, checksum.split("=")[-1] or None
+            ))
+        elif request.method == "DELETE":
+            return upload_response(lambda: store.abort(upload_id) or dict(id=upload_id))
+        return upload_response(lambda: store.meta(upload_id))
+
+    @app.route(f"{root}<upload_id>/commit/", methods=["POST"], endpoint=f"{name}_upload_commit")
+    def upload_commit(upload_id):
+        data = request.get_json(silent=True) or request.args
+
+        def commit():
+            meta = store.commit(upload_id, data.get("checksum"), folder.path)
+            folder.add_file(meta["filename"], meta["sha256"])
+            return meta
+        return upload_response(commit)
@@ -0,0 +1,28 @@
+from config import conf
+from importlib.util import find_spec
+from os import environ
+options = conf.get("gunicorn", {})
+mode = environ.get("SERVER-MODE") or options.get("mode", "gthread")
+note = None
+if mode == "gevent" and find_spec("gevent") is None:
+    # gevent is optional; without it the threaded workers take the same load.
+    mode, note = "gthread", "gevent is not installed, falling back to gthread workers"
+worker = options.get("modes", {}).get(mode, dict(worker_class=mode))
+
+if environ.get("PORT"):
+    bind = f"0.0.0.0:{environ['PORT']}"
+else:
+    bind = "{host}:{port}".format(**conf["app-server"])
+workers = int(environ.get("WEB_CONCURRENCY") or options.get("workers", 1))
+worker_class = worker.get("worker_class", "sync")
+threads = worker.get("threads", 1)
+worker_connections = worker.get("worker_connections", 1000)
+timeout = options.get("timeout", 30)
+graceful_timeout = options.get("graceful_timeout", 30)
+keepalive = options.get("keepalive", 2)
+
+
+def on_starting(server):
+    if note:
+        server.log.warning(note)
+    server.log.info("serving mode: %s (%s)", mode, worker_class)
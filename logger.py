@@ -1,35 +1,263 @@
 from config import app_home
+from module.serializer import dumps, loads
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from itertools import count
+from threading import Lock
+from fcntl import flock, LOCK_EX, LOCK_UN
+from pathlib import Path
+from time import time, sleep, strftime, localtime, monotonic
+from os import getpid, stat, fstat
+from copy import copy
 import logging
-import asyncio
+import atexit
 logfile = app_home.joinpath("history/app.log")
-logfile.open("w").write("")
-
-
-class History:
-
-    log = logging
-    log.basicConfig(
-        filename=str(logfile),
-        level=log.INFO,
-        format='''{
-    "message-type": "%(levelname)s",
-    "location": "%(pathname)s:%(lineno)d",
-    "module": "%(module)s",
-    "function": "%(funcName)s",
-    "time": "%(asctime)s.%(msecs)d",            
-    "message": "'%(message)s'"
-},''',
-        datefmt='%d/%m/%Y %H:%M:%S'
-    )
-
-    def __init__(self):
-        logfile.open("w").write("")
-        asyncio.run(self.init())
-
-    async def init(self):
-        await self.getinfo()
-        self.log.info("Started")
-
-    async def getinfo(self):
-        self.log.info("Starting")
+reserved = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sampled"}
+
+
+class NdjsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        data = dict(
+            time=record.created,
+            date=strftime("%d/%m/%Y %H:%M:%S", localtime(record.created)),
+            level=record.levelname,
+            logger=record.name,
+            location=f"{record.pathname}:{record.lineno}",
+            function=record.funcName,
+            pid=record.process,
+            thread=record.threadName,
+            message=record.getMessage()
+        )
+        if getattr(record, "sampled", None):
+            data["sampled"] = record.sampled
+        data.update({
+            k: v if isinstance(v, (str, int, float, bool, list, dict, type(None))) else repr(v)
+            for k, v in vars(record).items() if k not in reserved
+        })
+        if record.exc_info:
+            data["error"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["error"] = record.exc_text
+        return dumps(data).decode()
+
+
+class RecordQueueHandler(QueueHandler):
+    # Unlike QueueHandler.prepare, the traceback is kept apart from the message.
+
+    def prepare(self, record):
+        record = copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps 1 of every N records per logger; warnings and errors always pass.
+
+    def __init__(self, rates=None, level=logging.WARNING):
+        super().__init__()
+        self.every = {name: max(1, round(1.0 / rate)) for name, rate in (rates or {}).items() if rate > 0}
+        self.muted = {name for name, rate in (rates or {}).items() if rate <= 0}
+        self.level = level
+        self.counters = dict()
+
+    def rate_for(self, name):
+        while name:
+            if name in self.muted:
+                return 0
+            if name in self.every:
+                return self.every[name]
+            name = name.rpartition(".")[0]
+        return 1
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        every = self.rate_for(record.name)
+        if every == 1:
+            return True
+        if every == 0:
+            return False
+        counter = self.counters.get(record.name)
+        if counter is None:
+            counter = self.counters.setdefault(record.name, count())
+        if next(counter) % every:
+            return False
+        record.sampled = every
         return True
+
+
+class RotatingHandler(RotatingFileHandler):
+    # Rolls over by size or age. Workers share the file, so a rollover is
+    # taken under a lock and other workers reopen when the inode changes.
+
+    def __init__(self, filename, max_bytes=10 * 1024 ** 2, interval=24 * 3600.0, backups=7):
+        super().__init__(str(filename), maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self.interval = interval
+        self.lock_path = f"{self.baseFilename}.lock"
+        self.rollover_at = self.next_rollover()
+
+    def next_rollover(self):
+        # The file's age is the time of its first record.
+        if not self.interval:
+            return float("inf")
+        try:
+            with open(self.baseFilename, "rb") as file:
+                created = loads(file.readline())["time"]
+        except (OSError, ValueError, KeyError, TypeError):
+            created = time()
+        return created + self.interval
+
+    def reopen(self):
+        try:
+            current = stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            current = None
+        if self.stream is not None and current != stat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = None
+        if self.stream is None:
+            self.stream = self._open()
+            self.rollover_at = self.next_rollover()
+
+    def shouldRollover(self, record):
+        self.reopen()
+        if time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        with open(self.lock_path, "a") as lock:
+            flock(lock, LOCK_EX)
+            try:
+                # Another worker may have rotated while we waited for the lock.
+                self.reopen()
+                size = self.stream.seek(0, 2)
+                if size and (time() >= self.rollover_at or not self.maxBytes or size >= self.maxBytes):
+                    super().doRollover()
+                self.rollover_at = time() + self.interval if self.interval else float("inf")
+            finally:
+                flock(lock, LOCK_UN)
+
+
+class Logging:
+    listener = None
+    pid = None
+    lock = Lock()
+
+    @classmethod
+    def setup(cls, path=logfile, level=logging.INFO, sampling=None, **rotation):
+        with cls.lock:
+            if cls.listener is not None and cls.pid == getpid():
+                return cls.listener
+            # The listener thread does not survive a fork, so each worker starts its own.
+            queue = SimpleQueue()
+            Path(str(path)).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingHandler(path, **rotation)
+            handler.setFormatter(NdjsonFormatter())
+            cls.listener = QueueListener(queue, handler, respect_handler_level=True)
+            root = logging.getLogger()
+            root.handlers = [h for h in root.handlers if not isinstance(h, QueueHandler)]
+            enqueue = RecordQueueHandler(queue)
+            enqueue.addFilter(SamplingFilter(sampling))
+            root.addHandler(enqueue)
+            root.setLevel(level)
+            cls.pid = getpid()
+            cls.listener.start()
+            atexit.register(cls.stop)
+            return cls.listener
+
+    @classmethod
+    def stop(cls):
+        with cls.lock:
+            if cls.listener is not None and cls.pid == getpid():
+                cls.listener.stop()
+                for handler in cls.listener.handlers:
+                    handler.close()
+            cls.listener = None
+
+
+def log_files(path=logfile, rotated=True):
+    path = Path(str(path))
+    files = [path]
+    if rotated:
+        backups = sorted(
+            path.parent.glob(f"{path.name}.*"),
+            key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else -1
+        )
+        files = [p for p in reversed(backups) if p.suffix[1:].isdigit()] + files
+    return files
+
+
+def level_number(level):
+    if level is None or isinstance(level, int):
+        return level
+    if str(level).isdigit():
+        return int(level)
+    number = logging.getLevelName(str(level).upper())
+    if not isinstance(number, int):
+        raise ValueError(f"unknown log level: {level}")
+    return number
+
+
+def matches(record, since=None, level=None, name=None, contains=None):
+    if since is not None and record.get("time", 0) < since:
+        return False
+    if level is not None and logging.getLevelName(record.get("level", "NOTSET")) < level:
+        return False
+    if name and not str(record.get("logger", "")).startswith(name):
+        return False
+    if contains and contains not in str(record.get("message", "")):
+        return False
+    return True
+
+
+def read_log(path=logfile, since=None, level=None, name=None, contains=None,
+             rotated=True, follow=False, poll=0.5, timeout=None):
+    # Raises ValueError for an unknown level before any record is read.
+    filters = dict(since=since, level=level_number(level), name=name, contains=contains)
+    files = log_files(path, rotated)
+    deadline = monotonic() + timeout if follow and timeout else None
+    return read_files(files, filters, follow, poll, deadline)
+
+
+def read_files(files, filters, follow, poll, deadline):
+    for n, file in enumerate(files):
+        tail = follow and n == len(files) - 1
+        try:
+            source = open(str(file), "rb")
+        except FileNotFoundError:
+            continue
+        try:
+            while True:
+                if tail and deadline is not None and monotonic() >= deadline:
+                    break
+                line = source.readline()
+                if line.endswith(b"\n"):
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        continue
+                    if matches(record, **filters):
+                        yield record
+                elif not tail:
+                    break
+                else:
+                    # Keep a partial line until the writer finishes it, and move
+                    # to the new file once the current one has been rotated away.
+                    source.seek(-len(line), 1)
+                    try:
+                        rotated_away = stat(str(file)).st_ino != fstat(source.fileno()).st_ino
+                    except FileNotFoundError:
+                        rotated_away = False
+                    if rotated_away:
+                        source.close()
+                        source = open(str(file), "rb")
+                    else:
+                        sleep(poll)
+        finally:
+            source.close()
@@ -0,0 +1,224 @@
+from .shell import src_folder
+from .utils import getjson, save_json
+from threading import Thread, Lock
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from uuid import uuid4
+from time import time
+from os import getpid, kill, open as os_open, close, O_RDWR, O_CREAT
+from fcntl import flock, LOCK_EX, LOCK_UN
+from signal import SIGTERM
+import asyncio
+history = Path(__file__).parent.parent.joinpath("history")
+finished = ("done", "failed", "cancelled", "lost")
+
+
+class JobError(Exception):
+    code = 400
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code or self.code
+
+
+def alive(pid):
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def terminate(pid):
+    try:
+        kill(-pid, SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+class JobRunner:
+    workers = 2
+    keep = 200
+    timeout = 3600.0
+
+    def __init__(self, store=None, logs=None, **options):
+        self.store = Path(str(store or history.joinpath("jobs", "state.json")))
+        self.logs = Path(str(logs or history.joinpath("jobs")))
+        for key, value in options.items():
+            setattr(self, key, value)
+        self.lock = Lock()
+        self.loop = None
+        self.thread = None
+        self.pid = None
+        self.semaphore = None
+
+    @contextmanager
+    def records(self):
+        # Every worker shares the store, so each change is a locked read-modify-write.
+        self.store.parent.mkdir(parents=True, exist_ok=True)
+        fd = os_open(str(self.store.with_name(f".{self.store.name}.lock")), O_RDWR | O_CREAT)
+        try:
+            flock(fd, LOCK_EX)
+            try:
+                data = getjson(self.store)
+            except (FileNotFoundError, ValueError):
+                data = dict(connected=False, jobs={})
+            yield data
+            save_json(self.store, data, indent=4)
+        finally:
+            flock(fd, LOCK_UN)
+            close(fd)
+
+    def update(self, job_id, **fields):
+        with self.records() as data:
+            job = data["jobs"].get(job_id)
+            if job is not None:
+                job.update(fields)
+            return job
+
+    def start(self):
+        with self.lock:
+            if self.pid == getpid() and self.thread is not None and self.thread.is_alive():
+                return
+            self.pid = getpid()
+            self.loop = asyncio.new_event_loop()
+            self.semaphore = asyncio.Semaphore(self.workers)
+            self.thread = Thread(target=self.loop.run_forever, name="job-runner", daemon=True)
+            self.thread.start()
+        self.recover()
+
+    def recover(self):
+        with self.records() as data:
+            data["connected"] = True
+            for job in data["jobs"].values():
+                if job["status"] not in finished and not alive(job["owner"]):
+                    job.update(status="lost", finished=time())
+
+    def script(self, name):
+        path = src_folder.joinpath(str(name))
+        if path.parent != src_folder or not path.is_file():
+            raise JobError(f"unknown script {name}", 404)
+        return path
+
+    def submit(self, name, *args):
+        path = self.script(name)
+        self.start()
+        job_id = uuid4().hex[:12]
+        self.logs.mkdir(parents=True, exist_ok=True)
+        job = dict(
+            id=job_id, script=path.name, args=[str(a) for a in args], status="queued",
+            owner=getpid(), pid=None, returncode=None, cancel=False,
+            submitted=time(), started=None, finished=None, duration=None,
+            log=str(self.logs.joinpath(f"{job_id}.log"))
+        )
+        with self.records() as data:
+            data["jobs"][job_id] = job
+            self.prune(data["jobs"])
+        asyncio.run_coroutine_threadsafe(self.execute(job_id, path, job["args"]), self.loop)
+        return job
+
+    def prune(self, jobs):
+        done = sorted(
+            (job for job in jobs.values() if job["status"] in finished),
+            key=lambda job: job["submitted"]
+        )
+        for job in done[:max(0, len(jobs) - self.keep)]:
+            Path(job["log"]).unlink(missing_ok=True)
+            jobs.pop(job["id"])
+
+    async def store_call(self, func, *args, **kwargs):
+        # The store takes a file lock and does JSON I/O; keep it off the loop thread.
+        return await self.loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+    async def execute(self, job_id, path, args):
+        try:
+            async with self.semaphore:
+                await self.run_job(job_id, path, args)
+        except Exception as error:
+            await self.store_call(
+                self.update, job_id, status="failed", error=f"{type(error).__name__}: {error}",
+                finished=time()
+            )
+
+    async def run_job(self, job_id, path, args):
+        job = await self.store_call(self.update, job_id)
+        if job is None or job["cancel"]:
+            await self.store_call(self.update, job_id, status="cancelled", finished=time())
+            return
+        started = time()
+        with open(job["log"], "ab") as log:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "bash", str(path), *args, stdout=log, stderr=log,
+                    stdin=asyncio.subprocess.DEVNULL, start_new_session=True
+                )
+            except OSError as error:
+                log.write(f"{error}\n".encode())
+                await self.store_call(
+                    self.update, job_id, status="failed", finished=time(), duration=0.0
+                )
+                return
+            await self.store_call(
+                self.update, job_id, status="running", pid=process.pid, started=started
+            )
+            try:
+                returncode = await asyncio.wait_for(process.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                terminate(process.pid)
+                returncode = await process.wait()
+        await self.store_call(self.finish, job_id, returncode, started)
+
+    def finish(self, job_id, returncode, started):
+        with self.records() as data:
+            job = data["jobs"][job_id]
+            status = "cancelled" if job["cancel"] else "done" if returncode == 0 else "failed"
+            job.update(
+                status=status, returncode=returncode,
+                finished=time(), duration=time() - started
+            )
+
+    def get(self, job_id, offset=None):
+        try:
+            job = getjson(self.store)["jobs"].get(job_id)
+        except (FileNotFoundError, ValueError):
+            job = None
+        if job is None:
+            raise JobError("unknown job", 404)
+        if offset is not None:
+            try:
+                with open(job["log"], "rb") as log:
+                    log.seek(offset)
+                    output = log.read()
+            except FileNotFoundError:
+                output = b""
+            job.update(output=output.decode(errors="replace"), offset=offset + len(output))
+        return job
+
+    def jobs(self):
+        try:
+            return getjson(self.store)["jobs"]
+        except (FileNotFoundError, ValueError):
+            return dict()
+
+    def cancel(self, job_id):
+        with self.records() as data:
+            job = data["jobs"].get(job_id)
+            if job is None:
+                raise JobError("unknown job", 404)
+            if job["status"] in finished:
+                return job
+            job["cancel"] = True
+        if job["pid"]:
+            # The job may belong to another worker, so signal its process group directly.
+            terminate(job["pid"])
+        if alive(job["owner"]):
+            return job
+        # The worker that ran it is gone and won't record the end, so do it here.
+        return self.update(job_id, status="cancelled", finished=time())
+
+
+runner = JobRunner()
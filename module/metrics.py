@@ -0,0 +1,335 @@
+from bisect import bisect_left
+from threading import Thread, Lock, Event
+from functools import wraps
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from os import getpid, kill, open as os_open, close, O_RDWR, O_CREAT
+from fcntl import flock, LOCK_EX, LOCK_UN
+from json import dumps, loads
+import atexit
+folder = Path(__file__).parent.parent.joinpath("history", "metrics")
+
+
+def log_linear(low, high, steps=4):
+    # HDR-style buckets: each power of two is split into `steps` equal parts.
+    bounds, base = [], low
+    while base < high:
+        bounds.extend(base * (1 + i / steps) for i in range(steps))
+        base *= 2
+    return tuple(round(b, 9) for b in bounds if b <= high) + (high,)
+
+
+families = dict(
+    http_request_duration_seconds=("histogram", log_linear(1.0e-4, 60.0), "Request latency by endpoint"),
+    http_response_size_bytes=("histogram", tuple(4 ** i for i in range(3, 16)), "Response body size by endpoint"),
+    span_duration_seconds=("histogram", log_linear(1.0e-5, 60.0), "Time spent in instrumented code paths"),
+    http_requests_in_flight=("gauge", None, "Requests being served")
+)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    interval = 5.0
+
+    def __init__(self, root=folder):
+        self.root = Path(str(root))
+        self.lock = Lock()
+        self.data = dict()
+        self.changed = False
+        self.pid = None
+        self.thread = None
+        self.stop_event = Event()
+
+    def observe(self, name, value, **labels):
+        bounds = families[name][1]
+        key = label_key(labels)
+        with self.lock:
+            series = self.data.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = dict(counts=[0] * (len(bounds) + 1), sum=0.0, count=0)
+            entry["counts"][bisect_left(bounds, value)] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+            self.changed = True
+
+    def add(self, name, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.data.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            self.changed = True
+
+    @contextmanager
+    def span(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("span_duration_seconds", perf_counter() - start, span=name)
+
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [
+                    dict(labels=dict(key), value=dict(value, counts=list(value["counts"]))
+                         if isinstance(value, dict) else value)
+                    for key, value in series.items()
+                ]
+                for name, series in self.data.items()
+            }
+
+    def start(self):
+        if self.pid == getpid() and self.thread is not None and self.thread.is_alive():
+            return
+        # A forked worker starts from zero and keeps its own file.
+        with self.lock:
+            if self.pid is not None and self.pid != getpid():
+                self.data, self.changed = dict(), False
+        self.pid = getpid()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.stop_event.clear()
+        self.thread = Thread(target=self.loop, name="metrics-flush", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        if not self.changed or self.pid != getpid():
+            return
+        from .utils import write_atomic
+        self.changed = False
+        write_atomic(self.root.joinpath(f"worker-{self.pid}.json"), dumps(self.snapshot()).encode())
+
+    @contextmanager
+    def locked(self):
+        fd = os_open(str(self.root.joinpath(".lock")), O_RDWR | O_CREAT)
+        try:
+            flock(fd, LOCK_EX)
+            yield
+        finally:
+            flock(fd, LOCK_UN)
+            close(fd)
+
+    def collect(self):
+        # Live data for this worker, the last flush from every other worker,
+        # and everything left behind by workers that have exited.
+        from .utils import write_atomic
+        self.root.mkdir(parents=True, exist_ok=True)
+        merged = dict()
+        merge(merged, self.snapshot())
+        with self.locked():
+            archive_path = self.root.joinpath("archive.json")
+            archive = read(archive_path)
+            folded = False
+            for path in self.root.glob("worker-*.json"):
+                pid = int(path.stem.split("-")[1])
+                if pid == getpid():
+                    continue
+                data = read(path)
+                if alive(pid):
+                    merge(merged, data)
+                else:
+                    data.pop("http_requests_in_flight", None)
+                    merge(archive, data)
+                    path.unlink(missing_ok=True)
+                    folded = True
+            if folded:
+                write_atomic(archive_path, dumps(archive).encode())
+        merge(merged, archive)
+        return merged
+
+
+def alive(pid):
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read(path):
+    try:
+        return loads(Path(path).read_bytes())
+    except (OSError, ValueError):
+        return dict()
+
+
+def merge(into, data):
+    for name, series in data.items():
+        target = {label_key(i["labels"]): i for i in into.setdefault(name, [])}
+        for item in series:
+            key = label_key(item["labels"])
+            current = target.get(key)
+            if current is None:
+                value = item["value"]
+                value = dict(value, counts=list(value["counts"])) if isinstance(value, dict) else value
+                target[key] = dict(labels=dict(item["labels"]), value=value)
+                into[name].append(target[key])
+            elif isinstance(current["value"], dict):
+                value = current["value"]
+                value["counts"] = [a + b for a, b in zip(value["counts"], item["value"]["counts"])]
+                value["sum"] += item["value"]["sum"]
+                value["count"] += item["value"]["count"]
+            else:
+                current["value"] += item["value"]
+    return into
+
+
+def format_labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for k, v in sorted(labels.items())
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def prometheus(data):
+    lines = []
+    for name, (kind, bounds, description) in families.items():
+        series = data.get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for item in series:
+            labels, value = item["labels"], item["value"]
+            if kind == "gauge":
+                lines.append(f"{name}{format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, n in zip(bounds + ("+Inf",), value["counts"]):
+                cumulative += n
+                lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {value['sum']}")
+            lines.append(f"{name}_count{format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def summary(data):
+    # Percentiles are read off the buckets, so they are upper bounds.
+    result = dict()
+    for name, (kind, bounds, _) in families.items():
+        for item in data.get(name, []):
+            key = ",".join(f"{k}={v}" for k, v in sorted(item["labels"].items()))
+            value = item["value"]
+            if kind == "gauge":
+                result.setdefault(name, {})[key] = value
+                continue
+            quantiles = dict()
+            for q in (0.5, 0.9, 0.99):
+                rank, seen = q * value["count"], 0
+                for bound, n in zip(bounds + (float("inf"),), value["counts"]):
+                    seen += n
+                    if seen >= rank and n:
+                        quantiles[f"p{int(q * 100)}"] = bound
+                        break
+            result.setdefault(name, {})[key] = dict(
+                count=value["count"], sum=value["sum"],
+                mean=value["sum"] / value["count"] if value["count"] else 0.0, **quantiles
+            )
+    return result
+
+
+class Body:
+    # Counts the bytes sent and reports once the server closes the response.
+
+    def __init__(self, result, done):
+        self.result = result
+        self.done = done
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.result:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.result, "close"):
+                self.result.close()
+        finally:
+            if self.done is not None:
+                self.done(self.size)
+                self.done = None
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        start = perf_counter()
+        self.metrics.add("http_requests_in_flight", 1)
+        state = dict(status="000", length=None)
+
+        def capture(status, headers, exc_info=None):
+            state["status"] = status.split(" ", 1)[0]
+            for key, value in headers:
+                if key.lower() == "content-length":
+                    state["length"] = int(value)
+            return start_response(status, headers, exc_info) if exc_info else start_response(status, headers)
+
+        try:
+            result = self.app(environ, capture)
+        except BaseException:
+            self.finish(environ, start, dict(status="500", length=0), 0)
+            raise
+        wrapper = environ.get("wsgi.file_wrapper")
+        if wrapper is not None and isinstance(wrapper, type) and isinstance(result, wrapper):
+            # Leave sendfile responses alone; they are timed up to the headers.
+            self.finish(environ, start, state, state["length"] or 0)
+            return result
+        return Body(result, lambda size: self.finish(environ, start, state, size))
+
+    def finish(self, environ, start, state, size):
+        labels = dict(
+            method=environ.get("REQUEST_METHOD", ""),
+            endpoint=environ.get("metrics.endpoint") or "unmatched",
+            status=state["status"]
+        )
+        self.metrics.add("http_requests_in_flight", -1)
+        self.metrics.observe("http_request_duration_seconds", perf_counter() - start, **labels)
+        self.metrics.observe("http_response_size_bytes", size, **labels)
+
+
+metrics = Metrics()
+timed = metrics.timed
+span = metrics.span
+
+
+def install(app):
+    from flask import request
+    metrics.root = Path(str(app.config.get("METRICS_DIR", metrics.root)))
+    metrics.interval = app.config.get("METRICS_INTERVAL", metrics.interval)
+
+    @app.before_request
+    def record_endpoint():
+        request.environ["metrics.endpoint"] = request.endpoint or "unmatched"
+
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, metrics)
+    metrics.start()
+    return metrics
@@ -0,0 +1,198 @@
+from threading import Thread, Lock, Event, get_ident
+from collections import Counter
+from pathlib import Path
+from time import time, perf_counter, sleep
+from os import getpid
+import sys
+folder = Path(__file__).parent.parent.joinpath("history", "profiles")
+
+
+# Threads whose innermost frame is in these modules are parked on a lock,
+# queue or socket; they are left out unless idle=True.
+waiting = frozenset(("threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py"))
+# Loops that block in a C call (SimpleQueue.get, select.select) have no
+# Python frame below them, so they are known by file and function instead.
+parked = frozenset((
+    ("thread.py", "_worker"), ("handlers.py", "dequeue"), ("watcher.py", "run_inotify")
+))
+
+
+def is_idle(frame):
+    name = Path(frame.f_code.co_filename).name
+    return name in waiting or (name, frame.f_code.co_name) in parked
+
+
+def frame_name(code):
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Sampler:
+    # Nothing runs until start(); while sampling, one thread reads
+    # sys._current_frames() every `interval` seconds.
+    max_seconds = 60.0
+    min_interval = 0.001
+
+    def __init__(self):
+        self.lock = Lock()
+        self.thread = None
+        self.done = Event()
+        self.result = None
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds=10.0, interval=0.005, idle=False):
+        with self.lock:
+            if self.running():
+                return False
+            seconds = min(max(float(seconds), 0.1), self.max_seconds)
+            interval = max(float(interval), self.min_interval)
+            self.done.clear()
+            self.result = dict(
+                pid=getpid(), started=time(), seconds=seconds, interval=interval,
+                samples=0, stacks=Counter(), finished=None
+            )
+            self.thread = Thread(
+                target=self.run, args=(seconds, interval, idle), name="sampler", daemon=True
+            )
+            self.thread.start()
+            return True
+
+    def run(self, seconds, interval, idle):
+        me, result = get_ident(), self.result
+        end = perf_counter() + seconds
+        while perf_counter() < end:
+            stacks = [
+                collapse(frame) for ident, frame in sys._current_frames().items()
+                if ident != me and (idle or not is_idle(frame))
+            ]
+            # Readers copy the counter under the same lock.
+            with self.lock:
+                result["stacks"].update(stacks)
+                result["samples"] += 1
+            sleep(interval)
+        with self.lock:
+            result["finished"] = time()
+        self.done.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def snapshot(self):
+        with self.lock:
+            if self.result is None:
+                return None
+            return dict(self.result, stacks=Counter(self.result["stacks"]))
+
+    def collapsed(self):
+        result = self.snapshot()
+        if result is None:
+            return ""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in result["stacks"].most_common()
+        )
+
+    def status(self, top=20):
+        result = self.snapshot()
+        if result is None:
+            return dict(running=False)
+        result["running"] = self.running()
+        result["stacks"] = [
+            dict(stack=stack, count=count) for stack, count in result["stacks"].most_common(top)
+        ]
+        return result
+
+
+class RequestProfiles:
+    # Per-request cProfile, enabled only for requests carrying the configured token.
+    keep = 50
+
+    def __init__(self, root=folder):
+        self.root = Path(str(root))
+        self.token = None
+
+    def run(self, name, func):
+        from cProfile import Profile
+        profile = Profile()
+        try:
+            result = profile.runcall(func)
+        finally:
+            self.root.mkdir(parents=True, exist_ok=True)
+            filename = f"{int(time() * 1000)}-{getpid()}-{name}.prof"
+            profile.dump_stats(str(self.root.joinpath(filename)))
+            self.prune()
+        return result, filename
+
+    def prune(self):
+        files = sorted(self.root.glob("*.prof"), key=lambda p: p.name)
+        for path in files[:max(0, len(files) - self.keep)]:
+            path.unlink(missing_ok=True)
+
+    def list(self):
+        if not self.root.is_dir():
+            return []
+        return sorted((p.name for p in self.root.glob("*.prof")), reverse=True)
+
+    def path(self, name):
+        path = self.root.joinpath(Path(name).name)
+        return path if path.suffix == ".prof" and path.is_file() else None
+
+    def report(self, name, sort="cumulative", limit=40):
+        from pstats import Stats
+        from io import StringIO
+        out = StringIO()
+        Stats(str(self.path(name)), stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+sampler = Sampler()
+profiles = RequestProfiles()
+
+
+def install(app):
+    profiles.token = app.config.get("PROFILE_TOKEN")
+    if not profiles.token:
+        return
+    wrapped = app.wsgi_app
+
+    def wsgi_app(environ, start_response):
+        # One header lookup per request when no profile is asked for. The
+        # profile endpoints take the same header and are never profiled.
+        if environ.get("HTTP_X_PROFILE") != profiles.token or environ.get(
+            "PATH_INFO", ""
+        ).startswith("/admin/profile/"):
+            return wrapped(environ, start_response)
+        name = "".join(
+            c if c.isalnum() or c in "-_" else "." for c in environ.get("PATH_INFO", "").strip("/")
+        )[:80] or "root"
+        headers = []
+
+        def capture(status, response_headers, exc_info=None):
+            headers.append((status, response_headers, exc_info))
+            return lambda data: None
+
+        def call():
+            # Drain the body inside the profile so streamed responses count too.
+            result = wrapped(environ, capture)
+            try:
+                return b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        body, filename = profiles.run(name, call)
+        status, response_headers, exc_info = headers[0]
+        response_headers = [h for h in response_headers if h[0].lower() != "content-length"]
+        response_headers += [("Content-Length", str(len(body))), ("X-Profile-File", filename)]
+        start_response(status, response_headers, exc_info)
+        return [body]
+
+    app.wsgi_app = wsgi_app
@@ -0,0 +1,31 @@
+from flask import request, has_request_context
+from flask.json.provider import JSONProvider
+from .serializer import serializer
+
+
+def pretty(app):
+    value = request.args.get("pretty") if has_request_context() else None
+    if value is None:
+        return app.debug or bool(app.config.get("JSON_PRETTY"))
+    return value.lower() not in ("0", "false", "no", "")
+
+
+class JsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return serializer.dumps(
+            obj, indent=kwargs.get("indent"), sort_keys=kwargs.get("sort_keys", False),
+            ensure_ascii=kwargs.get("ensure_ascii", False)
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return serializer.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if pretty(self._app) else None
+        return self._app.response_class(
+            serializer.dumps(obj, indent=indent, sort_keys=bool(indent)) + b"\n",
+            mimetype=self.mimetype
+        )
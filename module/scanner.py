@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from os import scandir
+
+
+def iter_files(path, recursive=False, hidden=True):
+    try:
+        with scandir(str(path)) as entries:
+            for entry in entries:
+                if not hidden and entry.name.startswith("."):
+                    continue
+                if entry.is_file():
+                    yield entry
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    yield from iter_files(entry.path, recursive, hidden)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+
+def stat_entry(entry):
+    try:
+        return entry, entry.stat()
+    except FileNotFoundError:
+        return None
+
+
+def scan(path, build, workers=None, **opts):
+    entries = iter_files(path, **opts)
+    if not workers:
+        for entry in entries:
+            result = stat_entry(entry)
+            if result:
+                yield build(*result)
+        return
+    # On network filesystems each stat is a round trip, keep a bounded
+    # window of them in flight while still yielding in directory order.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for entry in entries:
+            window.append(pool.submit(stat_entry, entry))
+            if len(window) >= 4 * workers:
+                result = window.popleft().result()
+                if result:
+                    yield build(*result)
+        while window:
+            result = window.popleft().result()
+            if result:
+                yield build(*result)
+
+
+def file_info(entry, st):
+    return dict(
+        filename=entry.name,
+        size=st.st_size * 1.0e-6,
+        path=entry.path
+    )
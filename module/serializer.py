@@ -0,0 +1,67 @@
+from datetime import date
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+backends = ("json", "orjson")
+
+
+def default(o):
+    # Only reached for types json can't write, so the rarer imports wait until here.
+    from dataclasses import is_dataclass, asdict
+    from decimal import Decimal
+    from uuid import UUID
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, (Decimal, UUID)):
+        return str(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if is_dataclass(o):
+        return asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def get_backend(name=None):
+    if name in (None, "orjson") and orjson is not None:
+        return "orjson"
+    return "json"
+
+
+class Serializer:
+
+    def __init__(self, backend=None):
+        self.backend = get_backend(backend)
+
+    def dumps(self, data, indent=None, sort_keys=False, ensure_ascii=False):
+        # orjson only writes UTF-8 and two-space indents; other requests use json.
+        if self.backend == "orjson" and not ensure_ascii and indent in (None, 2):
+            option = orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(data, default=default, option=option)
+        return json.dumps(
+            data, indent=indent, sort_keys=sort_keys, ensure_ascii=ensure_ascii,
+            separators=None if indent else (",", ":"), default=default
+        ).encode()
+
+    def loads(self, data):
+        if self.backend == "orjson":
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+serializer = Serializer()
+
+
+def dumps(data, **config):
+    return serializer.dumps(data, **config)
+
+
+def loads(data):
+    return serializer.loads(data)
@@ -1,7 +1,6 @@
 from os import system, environ
 from pathlib import Path
 from dotenv import load_dotenv
-from subprocess import getoutput
 cpath = Path(__file__).parent
 load_dotenv(cpath.parent.joinpath(".env"))
 src_folder = cpath.joinpath("bash")
@@ -9,24 +8,32 @@ environ["TERM"] = "xterm"
 
 
 class CLI:
-    env = {}
 
     def __init__(self):
-        self.scripts = list(src_folder.iterdir())
-        self.refresh()
+        self.cached = dict()
+
+    @property
+    def scripts(self):
+        if "scripts" not in self.cached:
+            self.cached["scripts"] = list(src_folder.iterdir())
+        return self.cached["scripts"]
+
+    @property
+    def env(self):
+        # A child shell would only echo this process's environment back.
+        if "env" not in self.cached:
+            self.cached["env"] = {
+                "app-env": dict(environ),
+                "shell-env": dict(environ)
+            }
+        return self.cached["env"]
 
     def runscript(self, path, arg, *args):
-        path = src_folder.joinpath(str(path))
-        self.input(f"bash {str(path)} {arg} {' '.join(args)}")
+        from .jobs import runner
+        return runner.submit(path, arg, *args)
 
     def refresh(self):
-        self.env = {
-            "app-env": dict(environ),
-            "shell-env": {}
-        }
-        for e in self.input("env", getout=True):
-            k, v = e.split("=")[:2]
-            self.env["shell-env"][k] = v
+        self.cached.clear()
 
     @classmethod
     def input(cls, command, **opts):
@@ -37,6 +44,7 @@ class CLI:
 
     @staticmethod
     def output(command):
+        from subprocess import getoutput
         lines = getoutput(command).strip().splitlines()
         return [
             line for line in lines if line != ""
@@ -1,36 +1,119 @@
 from .shell import CLI
+from .scanner import scan, file_info
+from .serializer import dumps, loads
+from .metrics import timed
 from time import ctime
 from os.path import getctime
+from os import getpid, fsync, replace, stat, open as os_open, close, O_RDONLY, O_WRONLY, O_CREAT, O_EXCL
+from fcntl import flock, LOCK_EX, LOCK_UN
+from threading import get_ident, Lock
+from hashlib import blake2b
+from functools import lru_cache
+import socket
 from pathlib import Path
-from json import load, dumps
-from yaml import full_load
 from csv import DictReader
 jsonconfig = dict(
-    indent=4,
-    sort_keys=True,
+    indent=None,
+    sort_keys=False,
     ensure_ascii=False
 )
 
-hostname = CLI.input("hostname -I", getout=True)[0]
-url_root = f"http://{hostname}"
+written = dict()
+written_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def get_hostname():
+    # Connecting a UDP socket sends nothing; it only picks the outgoing address.
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(("10.255.255.255", 1))
+            return sock.getsockname()[0]
+    except OSError:
+        pass
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return "127.0.0.1"
+
+
+def __getattr__(name):
+    if name == "hostname":
+        return get_hostname()
+    if name == "url_root":
+        return f"http://{get_hostname()}"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def dumper(datastr: str, **config):
     settings = jsonconfig.copy()
     settings.update(config)
-    return dumps(datastr, **settings)
+    return dumps(datastr, **settings).decode()
 
 
 def getjson(filepath):
-    return load(Path(str(filepath)).open())
+    return loads(Path(str(filepath)).read_bytes())
 
 
 def get_yaml(filepath):
+    from yaml import full_load
     return full_load(Path(str(filepath)).open())
 
 
-def save_json(filepath, data, **config):
-    Path(str(filepath)).open("w").write(dumper(data, **config))
+@timed("save_json")
+def save_json(filepath, data, lock=False, **config):
+    settings = jsonconfig.copy()
+    settings.update(config)
+    return write_atomic(filepath, dumps(data, **settings), lock)
+
+
+def file_digest(path, st):
+    # Hashes are remembered per (size, mtime, inode) so unchanged files are read once.
+    key = (st.st_size, st.st_mtime_ns, st.st_ino)
+    with written_lock:
+        known = written.get(str(path))
+    if known and known[0] == key:
+        return known[1]
+    digest = blake2b(path.read_bytes(), digest_size=16).digest()
+    with written_lock:
+        written[str(path)] = (key, digest)
+    return digest
+
+
+def write_atomic(filepath, raw, lock=False):
+    path = Path(str(filepath))
+    digest = blake2b(raw, digest_size=16).digest()
+    fd = os_open(str(path.parent), O_RDONLY)
+    try:
+        if lock:
+            # The directory is locked rather than the file, which is replaced.
+            flock(fd, LOCK_EX)
+        try:
+            st = stat(path)
+            if st.st_size == len(raw) and file_digest(path, st) == digest:
+                return False
+        except FileNotFoundError:
+            pass
+        partial = path.with_name(f".{path.name}.{getpid()}.{get_ident()}.tmp")
+        out = os_open(str(partial), O_WRONLY | O_CREAT | O_EXCL, 0o666)
+        try:
+            with open(out, "wb") as file:
+                file.write(raw)
+                file.flush()
+                fsync(file.fileno())
+            replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        fsync(fd)
+        st = stat(path)
+        with written_lock:
+            written[str(path)] = ((st.st_size, st.st_mtime_ns, st.st_ino), digest)
+        return True
+    finally:
+        if lock:
+            flock(fd, LOCK_UN)
+        close(fd)
 
 
 def opencsv(filepath):
@@ -54,14 +137,5 @@ def getdate(path=None, formatted=False):
         )
 
 
-def get_files(path):
-    path = Path(str(path))
-    content = []
-    files = [i for i in path.iterdir() if i.is_file()]
-    for file in files:
-        content.append(dict(
-            filename=file.name,
-            size=file.stat().st_size * 1.0e-6,
-            path=str(file)
-        ))
-    return content
+def get_files(path, workers=None):
+    return list(scan(path, file_info, workers))
@@ -0,0 +1,170 @@
+from threading import Thread, Event, Lock
+from ctypes.util import find_library
+from pathlib import Path
+from select import select
+from struct import Struct
+from os import read, close, stat, getpid
+import ctypes
+event_struct = Struct("iIII")
+flags = dict(
+    modify=0x2, attrib=0x4, close_write=0x8, moved_from=0x40, moved_to=0x80,
+    create=0x100, delete=0x200, delete_self=0x400, move_self=0x800,
+    overflow=0x4000, ignored=0x8000, onlydir=0x1000000,
+    nonblock=0o4000, cloexec=0o2000000
+)
+watch_mask = sum(flags[i] for i in (
+    "modify", "attrib", "close_write", "moved_from", "moved_to",
+    "create", "delete", "delete_self", "move_self", "onlydir"
+))
+
+
+def get_inotify():
+    try:
+        libc = ctypes.CDLL(find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class Watcher:
+    interval = 2.0
+    delay = 0.2
+
+    def __init__(self, callback, interval=None, polling=False):
+        self.callback = callback
+        self.interval = interval or self.interval
+        self.libc = None if polling else get_inotify()
+        self.paths = dict()
+        self.wds = dict()
+        self.fd = -1
+        self.pid = None
+        self.thread = None
+        self.stopped = Event()
+        self.lock = Lock()
+
+    @property
+    def backend(self):
+        return "inotify" if self.fd >= 0 else "polling"
+
+    def watch(self, *paths):
+        with self.lock:
+            for path in map(str, paths):
+                if self.fd >= 0:
+                    wd = self.libc.inotify_add_watch(self.fd, path.encode(), watch_mask)
+                    if wd < 0:
+                        continue
+                    self.wds[wd] = path
+                    self.paths[path] = wd
+                else:
+                    self.paths[path] = self.mtime(path)
+
+    def unwatch(self, *paths):
+        with self.lock:
+            for path in map(str, paths):
+                wd = self.paths.pop(path, None)
+                if self.fd >= 0 and wd is not None:
+                    self.wds.pop(wd, None)
+                    self.libc.inotify_rm_watch(self.fd, wd)
+
+    def running(self):
+        return self.pid == getpid() and self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running():
+            return self
+        # A watcher inherited through fork has a dead thread and a shared fd,
+        # so every process starts its own.
+        self.pid, self.paths, self.wds, self.fd = getpid(), dict(), dict(), -1
+        self.stopped.clear()
+        if self.libc is not None:
+            self.fd = self.libc.inotify_init1(flags["nonblock"] | flags["cloexec"])
+        target = self.run_inotify if self.fd >= 0 else self.run_polling
+        self.thread = Thread(target=target, name=f"watcher-{self.backend}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(self.interval + 1.0)
+        if self.fd >= 0:
+            close(self.fd)
+            self.fd = -1
+
+    def notify(self, changed):
+        if changed:
+            try:
+                self.callback(changed)
+            except Exception:
+                pass
+
+    def run_inotify(self):
+        fd = self.fd
+        while not self.stopped.is_set():
+            ready = select([fd], [], [], self.interval)[0]
+            if not ready:
+                continue
+            # Let a burst of events (a copy, a git checkout) settle into one callback.
+            self.stopped.wait(self.delay)
+            changed = set()
+            while True:
+                try:
+                    data = read(fd, 65536)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    return
+                changed.update(self.parse(data))
+            self.notify(changed)
+
+    def parse(self, data):
+        changed, offset = set(), 0
+        while offset + event_struct.size <= len(data):
+            wd, mask, _, size = event_struct.unpack_from(data, offset)
+            offset += event_struct.size + size
+            if mask & flags["overflow"]:
+                with self.lock:
+                    changed.update(self.paths)
+                continue
+            with self.lock:
+                path = self.wds.get(wd)
+                if mask & flags["ignored"]:
+                    self.wds.pop(wd, None)
+                    if path is not None and self.paths.get(path) == wd:
+                        self.paths.pop(path, None)
+            if path is not None:
+                changed.add(path)
+        return changed
+
+    def run_polling(self):
+        while not self.stopped.wait(self.interval):
+            changed = set()
+            with self.lock:
+                paths = list(self.paths.items())
+            for path, mtime in paths:
+                current = self.mtime(path)
+                if current != mtime:
+                    changed.add(path)
+                    with self.lock:
+                        if path in self.paths:
+                            self.paths[path] = current
+            self.notify(changed)
+
+    @staticmethod
+    def mtime(path):
+        try:
+            return stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+
+def iter_dirs(path, hidden=False):
+    path = Path(str(path))
+    yield path
+    try:
+        for child in sorted(path.iterdir()):
+            if child.is_dir() and not child.is_symlink() and (hidden or not child.name.startswith(".")):
+                yield from iter_dirs(child, hidden)
+    except OSError:
+        return
@@ -0,0 +1,42 @@
+from benchmarks.suite import build_tree
+from tempfile import mkdtemp
+from shutil import rmtree
+from pathlib import Path
+from os import environ
+import atexit
+import pytest
+# container and drive read their roots at import time, so the synthetic tree
+# has to be in the environment before any test module imports them.
+root = Path(mkdtemp(prefix="api-tests-"))
+atexit.register(rmtree, str(root), True)
+home, drive, data = build_tree(root, 20)
+environ.update({
+    "HOME": str(home), "DRIVE-ROOT": str(drive), "CONTAINER-DATA": str(data),
+    "GIT-URL": "http://127.0.0.1:9"
+})
+
+
+def make_app(*views, **config):
+    from flask import Flask
+    from module.provider import JsonProvider
+    from view import add_view
+    app = Flask(__name__)
+    app.json = JsonProvider(app)
+    app.config.update(config)
+    add_view(app, *views)
+    return app
+
+
+@pytest.fixture(scope="session")
+def drive_app():
+    return make_app("drive")
+
+
+@pytest.fixture
+def client(drive_app):
+    return drive_app.test_client()
+
+
+@pytest.fixture
+def drive_root():
+    return drive
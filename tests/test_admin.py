@@ -0,0 +1,15 @@
+from conftest import make_app
+
+
+def test_jobs_disabled_without_token():
+    client = make_app("admin", JOBS_TOKEN=None).test_client()
+    assert client.get("/admin/jobs/").status_code == 404
+    assert client.post("/admin/jobs/", json=dict(script="git")).status_code == 404
+
+
+def test_jobs_token():
+    client = make_app("admin", JOBS_TOKEN="secret").test_client()
+    assert client.post("/admin/jobs/", json=dict(script="git")).status_code == 403
+    wrong = client.get("/admin/jobs/", headers={"X-Jobs-Token": "guess"})
+    assert wrong.status_code == 403
+    assert client.get("/admin/jobs/", headers={"X-Jobs-Token": "secret"}).status_code == 200
@@ -0,0 +1,112 @@
+from time import monotonic, sleep
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def videos():
+    from container import Videos
+    from container.probe import fields
+    Videos.ids.ensure()
+    # Sparse files have nothing to probe; seed the cache so ffmpeg never runs.
+    Videos.probe.store([
+        dict(path=str(path), size=st.st_size, mtime=st.st_mtime_ns, **{i: None for i in fields})
+        for path, st in ((p, p.stat()) for p in Videos.path.joinpath("c0", "videos").iterdir())
+    ])
+    yield Videos()
+    if Videos.probe.thread is not None:
+        Videos.probe.thread.join()
+
+
+def wait_for(check, timeout=5.0):
+    deadline = monotonic() + timeout
+    while monotonic() < deadline:
+        if check():
+            return True
+        sleep(0.05)
+    return check()
+
+
+def test_growth_in_place(videos):
+    # A file that grows in place leaves the directory mtime alone; the watcher
+    # has to make the next listing pick up the new size.
+    from container import Videos
+    before = videos.get_folder("c0")["total_size"]
+    path = sorted(Videos.path.joinpath("c0", "videos").iterdir())[0]
+    with open(path, "ab") as file:
+        file.truncate(path.stat().st_size + 5 * 10 ** 6)
+    assert wait_for(lambda: abs(videos.get_folder("c0")["total_size"] - before - 5.0) < 1.0e-6)
+
+
+def test_downscale_panorama():
+    from container.thumbs import downscale
+    assert downscale(np.full((20, 10000, 3), 200, np.uint8), 256).shape == (1, 250, 3)
+
+
+def test_downscale_16bit():
+    from container.thumbs import downscale
+    assert downscale(np.full((600, 800, 3), 60000, np.uint16), 256).max() == 233
+
+
+def test_growth_across_restart(tmp_path):
+    # The directory mtime still matches the stored record; only the
+    # per-file sizes show that a file grew while nothing was watching.
+    from container.index import FolderIndex
+    folder = tmp_path.joinpath("c1")
+    folder.mkdir()
+    folder.joinpath("a.mp4").write_bytes(b"a" * 100)
+    folder.joinpath("b.mp4").write_bytes(b"b" * 100)
+    files, _ = FolderIndex(tmp_path, tmp_path.joinpath("index")).get("c1")
+    assert files["a.mp4"][1] == 100
+    with folder.joinpath("a.mp4").open("ab") as file:
+        file.write(b"a" * 50)
+    files, changed = FolderIndex(tmp_path, tmp_path.joinpath("index")).get("c1")
+    assert changed and files["a.mp4"][1] == 150
+    files, changed = FolderIndex(tmp_path, tmp_path.joinpath("index")).get("c1")
+    assert not changed and files["a.mp4"][1] == 150
+
+
+def test_container_sizes_across_restart(tmp_path):
+    from container.index import ContainerIds
+    root, store = tmp_path.joinpath("containers"), tmp_path.joinpath("ids.json")
+    folder = root.joinpath("c1", "videos")
+    folder.mkdir(parents=True)
+    folder.joinpath("a.mp4").write_bytes(b"a" * 10 ** 6)
+    ids = ContainerIds(root, "videos", store, polling=True).ensure()
+    assert ids.snapshot()["sizes"] == {"c1": 1.0}
+    ids.watcher.stop()
+    with folder.joinpath("a.mp4").open("ab") as file:
+        file.write(b"a" * 10 ** 6)
+    ids = ContainerIds(root, "videos", store, polling=True).ensure()
+    assert ids.snapshot()["sizes"] == {"c1": 2.0}
+    ids.watcher.stop()
+
+
+def test_thumbs_recover_broken_pool(tmp_path):
+    import imageio.v2 as imageio
+    from concurrent.futures.process import BrokenProcessPool
+    from container.thumbs import ThumbCache
+    from os import _exit
+    source = tmp_path.joinpath("a.png")
+    imageio.imwrite(source, np.full((40, 60, 3), 90, np.uint8))
+    thumbs = ThumbCache(tmp_path.joinpath("thumbs"), workers=1)
+    broken = thumbs.get_pool()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(_exit, 1).result(30)
+    digest, target = thumbs.get("pictures", source, 32)
+    assert target.is_file() and thumbs.pool is not broken
+    thumbs.pool.shutdown()
+
+
+def test_refresh_post_only():
+    from conftest import make_app
+    from unittest.mock import patch
+    from container import Videos
+    client = make_app("container").test_client()
+    # The upstream scrape is replaced; only the request handling is under test.
+    with patch.object(Videos.scraper, "refresh", side_effect=lambda ids, *args: dict(ids=ids)) as refresh:
+        assert client.get("/container/videos/refresh/").status_code in (404, 405)
+        assert not refresh.called
+        assert client.post("/container/videos/refresh/?limit=0").get_json()["ids"] == ["c0"]
+        with patch("container.view.max_refresh", 0):
+            assert client.post("/container/videos/refresh/?limit=100000").get_json()["ids"] == []
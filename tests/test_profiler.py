@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from conftest import make_app
+from module.profiler import Sampler
+
+
+def test_sampler_reads_while_running():
+    sampler = Sampler()
+    busy = [True]
+
+    def spin():
+        while busy[0]:
+            sum(range(100))
+
+    thread = Thread(target=spin, daemon=True)
+    thread.start()
+    try:
+        assert sampler.start(0.5, 0)
+        assert sampler.result["interval"] == Sampler.min_interval
+        while sampler.running():
+            sampler.status()
+            sampler.collapsed()
+    finally:
+        busy[0] = False
+        thread.join()
+    assert sampler.status()["samples"] > 0
+    assert "spin" in sampler.collapsed()
+
+
+def test_sampler_skips_parked_threads():
+    with ThreadPoolExecutor(2) as pool:
+        pool.submit(sum, range(10)).result()
+        sampler = Sampler()
+        sampler.start(0.2, 0.01)
+        sampler.wait()
+        assert "_worker" not in sampler.collapsed()
+        sampler.start(0.2, 0.01, idle=True)
+        sampler.wait()
+        assert "_worker" in sampler.collapsed()
+
+
+def test_profile_token():
+    assert make_app("admin", PROFILE_TOKEN=None).test_client().get("/admin/profile/").status_code == 404
+    client = make_app("admin", PROFILE_TOKEN="secret").test_client()
+    assert client.get("/admin/profile/").status_code == 403
+    assert client.get("/admin/profile/requests/").status_code == 403
+    assert client.get("/admin/profile/requests/", headers={"X-Profile": "secret"}).status_code == 200
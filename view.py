@@ -1,10 +1,25 @@
-from views import blueprints
-from container.view import container
-blueprints["container"] = container
+from flask import Blueprint
+from importlib import import_module
+# Each view is imported only when an app asks for it, so unused ones cost nothing.
+views = dict(
+    main="views.main:main",
+    admin="views.admin:admin",
+    container="container.view:container",
+    drive="drive.build:init_drive"
+)
+
+
+def load_view(name):
+    module, attr = views[name].split(":")
+    return getattr(import_module(module), attr)
 
 
 def add_view(app, *names):
     for name in names:
-        blp = blueprints.get(name)
-        if blp:
-            app.register_blueprint(blp)
+        if name not in views:
+            continue
+        view = load_view(name)
+        if isinstance(view, Blueprint):
+            app.register_blueprint(view)
+        else:
+            view(app)
@@ -1,9 +1,28 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response, stream_with_context, send_file, current_app
+from module.serializer import dumps
+from module.jobs import runner, JobError
+from functools import wraps
+from hmac import compare_digest
 from os import kill, getpid
 from signal import SIGINT
 admin = Blueprint("admin", __name__)
 
 
+def require_token(setting, header):
+    # Endpoints that run code or expose internals stay off until a token is configured.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = current_app.config.get(setting)
+            if not token:
+                return jsonify(message=f"disabled, {setting} is not configured"), 404
+            if not compare_digest(request.headers.get(header, "").encode(), str(token).encode()):
+                return jsonify(message=f"missing or wrong {header} header"), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 @admin.route("/admin/")
 def admin_root():
     return jsonify(response="admin-route")
@@ -17,3 +36,103 @@ def admin_shutdown():
         success=True,
         message="Server is shutting down..."
     )
+
+
+@admin.errorhandler(JobError)
+def job_error(error):
+    return jsonify(message=str(error)), error.code
+
+
+@admin.route("/admin/jobs/", methods=["GET", "POST"])
+@require_token("JOBS_TOKEN", "X-Jobs-Token")
+def admin_jobs():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        args = data.get("args") or []
+        if isinstance(args, str):
+            args = args.split()
+        return jsonify(runner.submit(data.get("script", ""), *args)), 202
+    return jsonify(runner.jobs())
+
+
+@admin.route("/admin/jobs/<job_id>/", methods=["GET", "DELETE"])
+@require_token("JOBS_TOKEN", "X-Jobs-Token")
+def admin_job(job_id):
+    if request.method == "DELETE":
+        return jsonify(runner.cancel(job_id))
+    return jsonify(runner.get(job_id, request.args.get("offset", type=int)))
+
+
+@admin.route("/admin/logs/")
+def admin_logs():
+    from logger import read_log
+    args = request.args
+    # A followed stream holds a worker thread, so it always ends.
+    limit_follow = current_app.config.get("LOG_FOLLOW_TIMEOUT", 300.0)
+    try:
+        records = read_log(
+            since=args.get("since", type=float), level=args.get("level"),
+            name=args.get("logger"), contains=args.get("contains"),
+            rotated=args.get("rotated", "1") != "0", follow=args.get("follow") == "1",
+            timeout=min(max(args.get("timeout", limit_follow, type=float), 0.1), limit_follow)
+        )
+    except ValueError as error:
+        return jsonify(message=str(error)), 400
+    limit = args.get("limit", type=int)
+
+    def generate():
+        for n, record in enumerate(records):
+            if limit is not None and n >= limit:
+                break
+            yield dumps(record) + b"\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@admin.route("/admin/metrics/")
+def admin_metrics():
+    from module.metrics import metrics, prometheus, summary
+    data = metrics.collect()
+    fmt = request.args.get("format")
+    if fmt is None and request.accept_mimetypes.best == "application/json":
+        fmt = "json"
+    if fmt == "json":
+        return jsonify(summary=summary(data), series=data)
+    return Response(prometheus(data), mimetype="text/plain; version=0.0.4")
+
+
+@admin.route("/admin/profile/", methods=["GET", "POST"])
+@require_token("PROFILE_TOKEN", "X-Profile")
+def admin_profile():
+    from module.profiler import sampler
+    args = request.args
+    if request.method == "POST":
+        started = sampler.start(
+            args.get("seconds", 10.0, type=float), args.get("interval", 0.005, type=float),
+            args.get("idle") == "1"
+        )
+        if not started:
+            return jsonify(message="a profile is already running in this worker"), 409
+        if args.get("wait") != "1":
+            return jsonify(sampler.status()), 202
+        sampler.wait()
+    if args.get("format", "collapsed") == "json":
+        return jsonify(sampler.status(args.get("top", 20, type=int)))
+    return Response(sampler.collapsed(), mimetype="text/plain")
+
+
+@admin.route("/admin/profile/requests/")
+@admin.route("/admin/profile/requests/<name>")
+@require_token("PROFILE_TOKEN", "X-Profile")
+def admin_request_profiles(name=None):
+    from module.profiler import profiles
+    if name is None:
+        return jsonify(profiles.list())
+    path = profiles.path(name)
+    if path is None:
+        return jsonify(message="unknown profile"), 404
+    if request.args.get("format") == "raw":
+        return send_file(str(path), mimetype="application/octet-stream", as_attachment=True)
+    return Response(
+        profiles.report(name, request.args.get("sort", "cumulative"), request.args.get("limit", 40, type=int)),
+        mimetype="text/plain"
+    )